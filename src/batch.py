@@ -0,0 +1,132 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from transaction import Transaction, Journal
+from visual import Visualization
+from data import Data
+
+
+def load_jobs(source: str, start_date: str | None = None, end_date: str | None = None,
+              output_dir: str | None = None) -> list:
+    """
+    Build the job list from a JSON manifest or from a directory of workbooks (one entity per workbook, named after the
+    file). A manifest is a list of {"workbook", "entity", "start_date", "end_date", "adjustments", "output"} with
+    workbook/output paths relative to the manifest and adjustments as keyword arguments of "adjust_journal_entry"
+    """
+    if os.path.isdir(source):
+        if start_date is None or end_date is None:
+            raise ValueError("A start and end date are required to process a directory of workbooks.")
+
+        jobs: list = []
+        for filename in sorted(os.listdir(source)):
+            entity, extension = os.path.splitext(filename)
+            if extension.lower() != '.xlsx' or filename.startswith('~$'):
+                continue
+            jobs.append({
+                'workbook': os.path.join(source, filename),
+                'entity': entity,
+                'start_date': start_date,
+                'end_date': end_date,
+                'output': os.path.join(output_dir, f"{entity} {start_date} {end_date}.xlsx") if output_dir else None
+            })
+        return jobs
+
+    with open(source) as file:
+        jobs = json.load(file)
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    for job in jobs:
+        job['workbook'] = os.path.join(base_dir, job['workbook'])
+        if job.get('output'):
+            job['output'] = os.path.join(output_dir or base_dir, job['output'])
+    return jobs
+
+
+def process_job(job: dict) -> dict:
+    """
+    Ingest, post, adjust and export one entity/period (runs in a worker process)
+    """
+    # The id counter is process-global and workers run many jobs, reset it so every journal numbers its transactions
+    # from 1, whichever worker runs it
+    Transaction.transaction_counter = 0
+
+    journal = Journal(journal_name=job['entity'], start_date=job['start_date'], end_date=job['end_date'])
+
+    data = Data()
+    data.get_transactions_from_excel(job['workbook'], columnar=True)
+    journal.add_transactions(data.frame)
+
+    for adjustment in job.get('adjustments', []):
+        journal.adjust_journal_entry(**adjustment)
+
+    if job.get('output'):
+        exporter = Visualization(transactions=journal.transactions, journal=journal)
+        exporter.export_to_excel(job['output'], streaming=True)
+
+    return {
+        'entity': job['entity'],
+        'start_date': journal.start_date,
+        'end_date': journal.end_date,
+        'transactions': len(journal),
+        'adjustments': journal.adjustment_count,
+        'currency_scale': journal.entry_store.currency_scale,
+        'minor_balances': journal.statements.minor_balances()
+    }
+
+
+def consolidate(results: list) -> dict:
+    """
+    Merge the account balances of all entities into one consolidated trial balance per period
+    {(start_date, end_date): {category: {account: balance}}}, summed exactly in minor units of the entities' common
+    currency scale
+    """
+    scales: set = {result['currency_scale'] for result in results}
+    if len(scales) > 1:
+        raise ValueError(f"Entities with different currency scales {sorted(scales)} cannot be consolidated.")
+
+    consolidated: dict = {}
+    for result in results:
+        period = consolidated.setdefault((result['start_date'], result['end_date']), {})
+        for category, accounts in result['minor_balances'].items():
+            category_balances = period.setdefault(category, {})
+            for account, balance in accounts.items():
+                category_balances[account] = category_balances.get(account, 0) + balance
+    return consolidated
+
+
+def run_batch(jobs: list, workers: int | None = None) -> tuple[list, dict]:
+    """
+    Fan the jobs out over a process pool (workers=None uses all CPUs), returns the per-job results in job order and the
+    consolidated trial balances
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results: list = list(pool.map(process_job, jobs))
+
+    return results, consolidate(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Close many entities/periods in parallel")
+    parser.add_argument('source', help="Directory of workbooks or JSON manifest")
+    parser.add_argument('--start-date', help="Period start date for a directory of workbooks")
+    parser.add_argument('--end-date', help="Period end date for a directory of workbooks")
+    parser.add_argument('--output-dir', help="Directory for the exported workbooks")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all CPUs)")
+    args = parser.parse_args()
+
+    jobs = load_jobs(args.source, start_date=args.start_date, end_date=args.end_date, output_dir=args.output_dir)
+    results, consolidated = run_batch(jobs, workers=args.workers)
+
+    for result in results:
+        print(f"{result['entity']} {result['start_date']} to {result['end_date']}: "
+              f"{result['transactions']} transactions, {result['adjustments']} adjustments")
+    for (start_date, end_date), balances in consolidated.items():
+        minor_factor: int = 10 ** results[0]['currency_scale']
+        totals = {category: sum(accounts.values()) / minor_factor for category, accounts in balances.items()}
+        print(f"Consolidated {start_date} to {end_date}: {totals}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+import argparse
+import gc
+import json
+import os
+import resource
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from transaction import Journal
+from visual import Visualization
+from data import Data
+from posting import embed_transactions
+from instrumentation import current_rss
+
+# (debit category, debit account, credit category, credit account, weight, typical amount)
+TEMPLATES: list = [
+    ('Asset', 'Cash', 'Equity', 'Service revenue', 0.30, 900),
+    ('Asset', 'Accounts receivable', 'Equity', 'Service revenue', 0.12, 2500),
+    ('Asset', 'Cash', 'Asset', 'Accounts receivable', 0.10, 2500),
+    ('Equity', 'Salary expense', 'Asset', 'Cash', 0.10, 3200),
+    ('Equity', 'Rent expense', 'Asset', 'Cash', 0.04, 4000),
+    ('Equity', 'Utilities expense', 'Asset', 'Cash', 0.04, 350),
+    ('Equity', 'Service expense', 'Liability', 'Accounts payable', 0.08, 600),
+    ('Liability', 'Accounts payable', 'Asset', 'Cash', 0.08, 600),
+    ('Asset', 'Inventory', 'Liability', 'Accounts payable', 0.05, 1500),
+    ('Asset', 'Cash', 'Liability', 'Unearned revenue', 0.03, 4800),
+    ('Liability', 'Unearned revenue', 'Equity', 'Service revenue', 0.02, 800),
+    ('Equity', 'Tax expense', 'Asset', 'Cash', 0.02, 120),
+    ('Asset', 'Cash', 'Equity', 'Interest revenue', 0.01, 200),
+    ('Asset', 'Equipment', 'Asset', 'Cash', 0.005, 12000),
+    ('Asset', 'Cash', 'Liability', 'Notes payable', 0.005, 25000)
+]
+
+
+def generate_transactions(rows: int, seed: int = 42, start_date: str = '2025-10-01', days: int = 31) -> pd.DataFrame:
+    """
+    Seeded synthetic "Transactions" worksheet with a realistic mix of accounts, categories and amounts
+    """
+    rng = np.random.default_rng(seed)
+    weights = np.array([template[4] for template in TEMPLATES])
+    choice = rng.choice(len(TEMPLATES), size=rows, p=weights / weights.sum())
+
+    def pick(column: int) -> np.ndarray:
+        return np.array([template[column] for template in TEMPLATES], dtype=object)[choice]
+
+    typical = np.array([template[5] for template in TEMPLATES], dtype=float)[choice]
+    amounts = np.round(typical * rng.lognormal(mean=0.0, sigma=0.5, size=rows), 2)
+    dates = pd.Timestamp(start_date) + pd.to_timedelta(np.sort(rng.integers(0, days, size=rows)), unit='D')
+    descriptions = pd.Series(pick(3)).str.cat(pd.Series(np.arange(1, rows + 1).astype(str)), sep=' #')
+
+    return pd.DataFrame({
+        'Transaction ID': np.arange(1, rows + 1),
+        'Date': dates,
+        'Description': descriptions,
+        'Debit Category': pick(0),
+        'Debit Account': pick(1),
+        'Debit Amount': amounts,
+        'Credit Category': pick(2),
+        'Credit Account': pick(3),
+        'Credit Amount': amounts
+    })
+
+
+def write_workbook(df: pd.DataFrame, filename: str):
+    """
+    Write a generated worksheet like "Transactions.xlsx"
+    """
+    df.to_excel(filename, sheet_name='Transactions', index=False)
+
+
+class Stage:
+    """
+    Measures wall time and peak memory (RSS sampled in a background thread) of a benchmark stage
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval: float = interval
+        self.seconds: float = 0.0
+        self.peak_bytes: int = 0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_bytes = max(self.peak_bytes, current_rss())
+
+    def __enter__(self):
+        gc.collect()
+        self.baseline = current_rss()
+        self.peak_bytes = self.baseline
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._start
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, current_rss())
+        if self.baseline == 0:  # No /proc, fall back to the process high-water mark
+            self.peak_bytes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return False
+
+    def result(self) -> dict:
+        return {'seconds': round(self.seconds, 4), 'peak_mb': round((self.peak_bytes - self.baseline) / 2 ** 20, 1)}
+
+
+def run_size(rows: int, seed: int, workdir: str, skip: set) -> dict:
+    """
+    Time every stage of the accounting cycle on a generated workbook with "rows" transactions
+    """
+    results: dict = {}
+    workbook = os.path.join(workdir, f"Transactions_{rows}_{seed}.xlsx")
+    if not os.path.exists(workbook):
+        write_workbook(generate_transactions(rows, seed=seed), workbook)
+
+    def stage(name: str, function):
+        if name in skip:
+            return None
+        with Stage() as measure:
+            value = function()
+        results[name] = measure.result()
+        return value
+
+    data = Data()
+    stage('ingest', lambda: data.get_transactions_from_excel(workbook))
+    if not data.transactions:
+        return results
+
+    journal = Journal(journal_name=f"Benchmark {rows}", start_date='2025-10-01', end_date='2025-10-31')
+    with Stage() as measure:
+        embed_transactions(data.transactions, journal=journal)
+    results['embed'] = measure.result()
+
+    stage('account_balances', journal.get_account_balances)
+    stage('trial_balance', journal.get_trial_balance)
+    stage('verify', journal.verify)
+    stage('entries_by_date', lambda: [len(journal.get_entries_by_date(f'2025-10-{day:02d}')) for day in range(1, 32)])
+    stage('entries_between', lambda: len(journal.get_entries_between('2025-10-10', '2025-10-20')))
+    stage('single_account', lambda: [len(journal.get_single_account_entries(template[3]))
+                                     for template in TEMPLATES])
+
+    exporter = Visualization(transactions=journal.transactions, journal=journal)
+    stage('export', lambda: exporter.export_to_excel(os.path.join(workdir, 'export.xlsx')))
+    stage('export_streaming', lambda: exporter.export_to_excel(os.path.join(workdir, 'export.xlsx'), streaming=True))
+
+    return results
+
+
+def compare(results: dict, baseline: dict) -> list:
+    """
+    Time ratio (current / baseline) per size and stage
+    """
+    lines: list = []
+    for rows, stages in results.items():
+        for name, current in stages.items():
+            before = baseline.get(rows, {}).get(name)
+            if before and before['seconds'] > 0:
+                lines.append(f"{rows:>8} {name:<18} {current['seconds']:>9.4f}s vs {before['seconds']:>9.4f}s "
+                             f"({current['seconds'] / before['seconds']:.2f}x)")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingestion, posting, queries and export")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workdir', help="Directory for generated workbooks (reused between runs)")
+    parser.add_argument('--skip', nargs='*', default=[], help="Stages to skip, e.g. export")
+    parser.add_argument('--save', help="Write the results as JSON (e.g. a new baseline)")
+    parser.add_argument('--baseline', help="Compare against a stored JSON baseline")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='accounting-benchmark-')
+    os.makedirs(workdir, exist_ok=True)
+
+    results: dict = {}
+    for rows in args.sizes:
+        results[str(rows)] = run_size(rows, seed=args.seed, workdir=workdir, skip=set(args.skip))
+        for name, measure in results[str(rows)].items():
+            print(f"{rows:>8} {name:<18} {measure['seconds']:>9.4f}s {measure['peak_mb']:>8.1f} MB")
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        print("\n".join(compare(results, baseline)))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,32 +1,185 @@
+import os
+from itertools import islice
+
+import numpy as np
 import pandas as pd
 
+from worksheet import WorksheetReader
+
 
 class Data:
+    # Worksheet column -> transaction field, in the order of the transaction dict
+    columns: dict = {
+        'Debit Category': 'debit_category',
+        'Debit Account': 'debit_account_name',
+        'Debit Amount': 'debit_amount',
+        'Credit Category': 'credit_category',
+        'Credit Account': 'credit_account_name',
+        'Credit Amount': 'credit_amount'
+    }
+
     def __init__(self):
         self.transactions: dict = {}
         self.journal: dict = {}
+        self.frame: pd.DataFrame | None = None  # Columnar transactions (see "get_transactions_from_excel")
+        self.fingerprints: np.ndarray | None = None  # Content fingerprint per imported row (see "row_fingerprints")
+
+    @staticmethod
+    def normalise_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Normalise a raw "Transactions" worksheet column-wise into transaction fields (dates, blanks, amounts)
+        """
+        dates = df['Date']
+        if pd.api.types.is_datetime64_any_dtype(dates):
+            date_str = dates.dt.strftime('%Y-%m-%d')
+        else:
+            date_str = dates.map(lambda value: value.strftime('%Y-%m-%d') if hasattr(value, 'strftime') else str(value))
+
+        frame = pd.DataFrame({'date': date_str, 'description': df['Description'].astype(str)}, index=df.index)
+        for column, field in Data.columns.items():
+            if field.endswith('_amount'):
+                frame[field] = df[column].astype(float).fillna(0.0)
+            else:
+                values = df[column]
+                frame[field] = values.astype(str).where(values.notna(), "")
+
+        return frame
+
+    @staticmethod
+    def row_fingerprints(frame: pd.DataFrame, occurrences: dict | None = None,
+                         transaction_ids: pd.Series | None = None) -> np.ndarray:
+        """
+        Content hash per normalised row combined with the row's "Transaction ID" if the source has one, or else with
+        its ordinal among identical rows of the source (int64), so identical rows stay distinct and reading the same
+        source again gives the same fingerprints. Pass the same occurrences dict {content hash: rows seen} for all
+        chunks of a source
+        """
+        content = pd.Series(pd.util.hash_pandas_object(frame[['date', 'description', *Data.columns.values()]],
+                                                       index=False).to_numpy())
+        if transaction_ids is not None:
+            # Whole-number ids hash alike whether a source typed them as int or float (e.g. with blanks)
+            ids = pd.Series(transaction_ids).reset_index(drop=True)
+            if pd.api.types.is_float_dtype(ids) and (ids.dropna() % 1 == 0).all():
+                ids = ids.astype('Int64')
+            combined = pd.DataFrame({'content': content, 'transaction_id': ids.astype(str)})
+            return pd.util.hash_pandas_object(combined, index=False).to_numpy().view(np.int64)
+
+        ordinal = content.groupby(content.to_numpy()).cumcount()
+        if occurrences is not None:
+            ordinal += content.map(occurrences).fillna(0).astype(np.int64)
+            occurrences.update((ordinal + 1).groupby(content.to_numpy()).max().to_dict())
+
+        combined = pd.DataFrame({'content': content, 'ordinal': ordinal.astype(np.uint64)})
+        return pd.util.hash_pandas_object(combined, index=False).to_numpy().view(np.int64)
+
+    @staticmethod
+    def transaction_keys(df: pd.DataFrame, fingerprints: np.ndarray) -> list:
+        """
+        Use Transaction ID or the row fingerprint as key to avoid overwriting
+        """
+        if 'Transaction ID' in df.columns:
+            return df['Transaction ID'].tolist()
+        return fingerprints.tolist()
+
+    @staticmethod
+    def to_transactions(df: pd.DataFrame, frame: pd.DataFrame | None = None,
+                        fingerprints: np.ndarray | None = None) -> dict:
+        """
+        Convert a raw "Transactions" worksheet (or a chunk of it) into the transactions dict {key: transaction}
+        (frame and fingerprints are computed from df unless given)
+        """
+        if frame is None:
+            frame = Data.normalise_frame(df)
+        if fingerprints is None:
+            fingerprints = Data.row_fingerprints(frame, transaction_ids=df.get('Transaction ID'))
+        fields: list = list(frame.columns)
+        records = zip(*(frame[field].tolist() for field in fields))
+        return {key: dict(zip(fields, record)) for key, record in zip(Data.transaction_keys(df, fingerprints), records)}
 
-    def get_transactions_from_excel(self, filename: str = "Transactions.xlsx"):
+    @staticmethod
+    def check_columns(df: pd.DataFrame, filename: str):
+        """
+        Check that a source has all columns of the "Transactions" worksheet
+        """
+        missing = [column for column in ['Date', 'Description', *Data.columns] if column not in df.columns]
+        if missing:
+            raise ValueError(f"{filename} is missing the columns {missing}.")
+
+    @staticmethod
+    def rows_to_frame(rows: list, header: list) -> pd.DataFrame:
+        """
+        DataFrame of worksheet rows (see "WorksheetReader.iter_rows") under the header row, short rows are padded
+        and cells beyond the header are left out
+        """
+        width: int = len(header)
+        return pd.DataFrame([row[:width] if len(row) >= width else row + [None] * (width - len(row)) for row in rows],
+                            columns=header)
+
+    @staticmethod
+    def read_chunks(filename: str, chunk_size: int = 50000):
+        """
+        Yield a CSV, Parquet or Excel ("Transactions" worksheet) source as raw DataFrames of at most chunk_size rows
+        """
+        extension = os.path.splitext(filename)[1].lower()
+
+        if extension == '.csv':
+            yield from pd.read_csv(filename, chunksize=chunk_size, parse_dates=['Date'])
+
+        elif extension == '.parquet':
+            try:
+                import pyarrow.parquet as pq
+            except ImportError as error:
+                raise ImportError("Reading Parquet files requires pyarrow.") from error
+
+            for batch in pq.ParquetFile(filename).iter_batches(batch_size=chunk_size):
+                yield batch.to_pandas()
+
+        elif extension in ('.xlsx', '.xlsm'):
+            rows = WorksheetReader(filename, 'Transactions').iter_rows()
+            header = next(rows, None)
+            while header is not None:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                yield Data.rows_to_frame(chunk, header)
+
+        else:
+            raise ValueError(f"Unsupported source format '{extension}', expected .csv, .parquet or .xlsx.")
+
+    def iter_frames(self, filename: str, chunk_size: int = 50000):
+        """
+        Import transactions chunk by chunk with bounded memory, yields one normalised DataFrame per chunk
+        (indexed by transaction key, with the row fingerprints of the whole source in column "fingerprint")
+        """
+        occurrences: dict = {}
+        for df in self.read_chunks(filename, chunk_size):
+            self.check_columns(df, filename)
+            df = df.dropna(how='all')
+            if len(df):
+                frame = self.normalise_frame(df)
+                fingerprints = self.row_fingerprints(frame, occurrences, transaction_ids=df.get('Transaction ID'))
+                frame.index = pd.Index(self.transaction_keys(df, fingerprints))
+                frame['fingerprint'] = fingerprints
+                yield frame
+
+    def get_transactions_from_excel(self, filename: str = "Transactions.xlsx", columnar: bool = False):
         """
         Import transactions from Excel worksheet "Transactions"
+        (columnar=True keeps the normalised DataFrame in "frame" instead of building the transactions dict), the row
+        fingerprints are kept in "fingerprints"
         """
-        df = pd.read_excel(filename, sheet_name='Transactions')
-        self.transactions = {}
-
-        for _, row in df.iterrows():
-            date_str: str = row['Date'].strftime('%Y-%m-%d') if hasattr(row['Date'], 'strftime') else str(row['Date'])
-
-            transaction: dict = {
-                "date": date_str,
-                "description": str(row['Description']),
-                "debit_category": str(row['Debit Category']) if pd.notna(row['Debit Category']) else "",
-                "debit_account_name": str(row['Debit Account']) if pd.notna(row['Debit Account']) else "",
-                "debit_amount": float(row['Debit Amount']) if pd.notna(row['Debit Amount']) else 0.0,
-                "credit_category": str(row['Credit Category']) if pd.notna(row['Credit Category']) else "",
-                "credit_account_name": str(row['Credit Account']) if pd.notna(row['Credit Account']) else "",
-                "credit_amount": float(row['Credit Amount']) if pd.notna(row['Credit Amount']) else 0.0
-            }
-
-            # Use Transaction ID or date+description as key to avoid overwriting
-            key: int = row.get('Transaction ID', date_str + '_' + transaction['description'][:20])
-            self.transactions[key] = transaction
+        rows = WorksheetReader(filename, 'Transactions').iter_rows()
+        header = next(rows, None)
+        if header is None:
+            raise ValueError(f"{filename} has an empty 'Transactions' worksheet.")
+        df = self.rows_to_frame(list(rows), header)
+        frame = self.normalise_frame(df)
+        self.fingerprints = self.row_fingerprints(frame, transaction_ids=df.get('Transaction ID'))
+
+        if columnar:
+            frame.index = pd.Index(self.transaction_keys(df, self.fingerprints))
+            self.frame = frame
+            self.transactions = {}
+            return
+
+        self.transactions = self.to_transactions(df, frame, self.fingerprints)
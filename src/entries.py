@@ -0,0 +1,493 @@
+import numpy as np
+
+
+class Vocabulary:
+    """
+    Dictionary encoding of repeated strings (accounts, categories, dates) as integer codes
+    """
+
+    def __init__(self):
+        self.values: list = []  # Code -> value
+        self.codes: dict = {}  # Value -> code
+
+    def encode(self, value: str) -> int:
+        """
+        Return the code of a value, adding it to the vocabulary if it is new
+        """
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def get(self, value: str) -> int:
+        """
+        Return the code of a value or -1 if it was never encoded
+        """
+        return self.codes.get(value, -1)
+
+    def __len__(self):
+        return len(self.values)
+
+
+class SortedIndex:
+    """
+    Entry positions kept sorted by an integer key (e.g. the day number of the entry date) in NumPy arrays, stable for
+    equal keys
+    """
+
+    def __init__(self, capacity: int = 16):
+        self.size: int = 0
+        self.keys = np.empty(capacity, dtype=np.int64)  # Sorted keys (filled up to size)
+        self.positions = np.empty(capacity, dtype=np.int64)  # Entry position per key
+
+    def _reserve(self, count: int):
+        """
+        Grow the arrays (amortised doubling) so that "count" more keys fit
+        """
+        required = self.size + count
+        capacity = len(self.keys)
+        if required <= capacity:
+            return
+
+        while capacity < required:
+            capacity *= 2
+        for name in ['keys', 'positions']:
+            grown = np.empty(capacity, dtype=np.int64)
+            grown[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, grown)
+
+    def insert(self, key: int, position: int):
+        """
+        Insert a position (O(1) amortised when keys arrive in order)
+        """
+        size = self.size
+        if size == len(self.keys):
+            self._reserve(1)
+        keys, positions = self.keys, self.positions
+        index = size
+        if size and key < keys[size - 1]:
+            index = int(keys[:size].searchsorted(key, side='right'))
+            keys[index + 1:size + 1] = keys[index:size]
+            positions[index + 1:size + 1] = positions[index:size]
+        keys[index] = key
+        positions[index] = position
+        self.size = size + 1
+
+    def extend(self, keys: np.ndarray, positions: np.ndarray):
+        """
+        Insert many positions at once - only the batch is sorted, it is appended directly when it follows the indexed
+        keys and merged into them otherwise (equal keys keep batch order after the indexed ones)
+        """
+        count = len(keys)
+        if count == 0:
+            return
+
+        keys = np.asarray(keys, dtype=np.int64)
+        positions = np.asarray(positions, dtype=np.int64)
+        if count > 1 and (keys[1:] < keys[:-1]).any():
+            order = np.argsort(keys, kind='stable')
+            keys, positions = keys[order], positions[order]
+
+        size = self.size
+        self._reserve(count)
+        if size == 0 or keys[0] >= self.keys[size - 1]:
+            self.keys[size:size + count] = keys
+            self.positions[size:size + count] = positions
+            self.size += count
+            return
+
+        # Slots of the batch in the merged arrays, the indexed keys fill the others in order
+        slots = np.searchsorted(self.keys[:size], keys, side='right') + np.arange(count)
+        indexed = np.ones(size + count, dtype=bool)
+        indexed[slots] = False
+        for name, values in [('keys', keys), ('positions', positions)]:
+            merged = np.empty(len(getattr(self, name)), dtype=np.int64)
+            merged[:size + count][indexed] = getattr(self, name)[:size]
+            merged[slots] = values
+            setattr(self, name, merged)
+        self.size += count
+
+    def range(self, start: int | None = None, end: int | None = None) -> np.ndarray:
+        """
+        Positions with start <= key <= end in key order (open ends if None)
+        """
+        keys = self.keys[:self.size]
+        lo = 0 if start is None else int(np.searchsorted(keys, start, side='left'))
+        hi = self.size if end is None else int(np.searchsorted(keys, end, side='right'))
+        return self.positions[lo:hi].copy()
+
+    def __len__(self):
+        return self.size
+
+
+class EntryStore:
+    """
+    Columnar storage of journal entries - numeric arrays for ids and amounts, integer codes for dates, categories and
+    accounts - with running debit/credit totals per account. Amounts are exact int64 minor units (cents for a
+    currency_scale of 2), converted from and to currency amounts only at the boundaries
+    """
+    fields: tuple = ('transaction_id', 'date', 'description', 'debit_category', 'debit_account', 'debit_amount',
+                     'credit_category', 'credit_account', 'credit_amount')
+
+    def __init__(self, capacity: int = 1024, currency_scale: int = 2):
+        self.currency_scale: int = currency_scale  # Decimal places of the currency
+        self.minor_factor: int = 10 ** currency_scale  # Minor units per currency unit
+        self.size: int = 0
+        self.transaction_id = np.empty(capacity, dtype=np.int64)
+        self.date = np.empty(capacity, dtype=np.int32)  # Codes into "dates"
+        self.debit_category = np.empty(capacity, dtype=np.int32)  # Codes into "categories"
+        self.debit_account = np.empty(capacity, dtype=np.int32)  # Codes into "accounts"
+        self.debit_amount = np.empty(capacity, dtype=np.int64)  # Minor units
+        self.credit_category = np.empty(capacity, dtype=np.int32)
+        self.credit_account = np.empty(capacity, dtype=np.int32)
+        self.credit_amount = np.empty(capacity, dtype=np.int64)
+        self.description: list = []
+
+        self.dates = Vocabulary()
+        self.date_days = np.zeros(0, dtype=np.int64)  # Day number (days since 1970-01-01) per date code
+        self.categories = Vocabulary()
+        self.accounts = Vocabulary()
+
+        self.debit_totals = np.zeros(16, dtype=np.int64)  # Running debit total per account code (minor units)
+        self.credit_totals = np.zeros(16, dtype=np.int64)  # Running credit total per account code (minor units)
+        self.account_categories: dict = {}  # (category code, account code) in order of first posting
+        self.version: int = 0  # Bumped by every append/extend
+        self.account_versions = np.zeros(16, dtype=np.int64)  # Version of the last posting per account code
+
+        self.max_lengths: dict = dict.fromkeys(self.fields, 0)  # Longest str() per field (export column widths)
+
+        self.date_index = SortedIndex()  # All entry positions sorted by date (keyed by day number)
+        self.account_index: dict = {}  # Account code -> SortedIndex of the entries debiting or crediting the account
+
+    def to_minor(self, amount: float) -> int:
+        """
+        Convert a currency amount to minor units
+        """
+        return round(amount * self.minor_factor)
+
+    def to_minor_array(self, amounts) -> np.ndarray:
+        """
+        Convert currency amounts to an int64 array of minor units
+        """
+        return np.rint(np.asarray(amounts, dtype=np.float64) * self.minor_factor).astype(np.int64)
+
+    def from_minor(self, amount):
+        """
+        Convert minor units (scalar or array) back to currency amounts
+        """
+        return amount / self.minor_factor
+
+    @staticmethod
+    def day_number(date: str) -> int:
+        """
+        Days since 1970-01-01 of a date "YYYY-MM-DD" (ValueError if it is not a date)
+        """
+        day = np.datetime64(date, 'D')
+        if np.isnat(day):
+            raise ValueError(f"Not a date: {date!r}.")
+        return int(day.astype(np.int64))
+
+    def _encode_dates(self, dates: list) -> np.ndarray:
+        """
+        Codes of dates "YYYY-MM-DD", new dates are added to the vocabulary with their day number (a ValueError is
+        raised before anything is added if one of them is not a date)
+        """
+        new: list = [date for date in dict.fromkeys(dates) if self.dates.get(date) < 0]
+        if new:
+            days = np.array(new, dtype='datetime64[D]')
+            if np.isnat(days).any():
+                raise ValueError(f"Not a date: {new[int(np.flatnonzero(np.isnat(days))[0])]!r}.")
+            days = days.astype(np.int64)
+            for date in new:
+                self.dates.encode(date)
+            self.date_days = np.concatenate([self.date_days, days])
+        codes = self.dates.codes
+        return np.fromiter(map(codes.__getitem__, dates), dtype=np.int32, count=len(dates))
+
+    def _reserve(self, count: int):
+        """
+        Grow the column arrays (amortised doubling) so that "count" more entries fit
+        """
+        required = self.size + count
+        capacity = len(self.transaction_id)
+        if required <= capacity:
+            return
+
+        while capacity < required:
+            capacity *= 2
+        for name in self.fields:
+            if name != 'description':
+                column = getattr(self, name)
+                grown = np.empty(capacity, dtype=column.dtype)
+                grown[:self.size] = column[:self.size]
+                setattr(self, name, grown)
+
+    def _reserve_accounts(self):
+        """
+        Grow the per-account totals to cover every encoded account
+        """
+        count = len(self.accounts)
+        if count <= len(self.debit_totals):
+            return
+
+        capacity = max(count, 2 * len(self.debit_totals))
+        for name in ['debit_totals', 'credit_totals', 'account_versions']:
+            totals = getattr(self, name)
+            grown = np.zeros(capacity, dtype=totals.dtype)
+            grown[:len(totals)] = totals
+            setattr(self, name, grown)
+
+    def append(self, transaction_id: int, date: str, description: str,
+               debit_category: str, debit_account: str, debit_amount: int,
+               credit_category: str, credit_account: str, credit_amount: int) -> int:
+        """
+        Append a single entry (amounts in minor units), update the account totals and return its position
+        """
+        date_code = self.dates.get(date)
+        if date_code < 0:
+            date_code = int(self._encode_dates([date])[0])
+        self._reserve(1)
+        position = self.size
+
+        debit_category_code = self.categories.encode(debit_category)
+        debit_account_code = self.accounts.encode(debit_account)
+        credit_category_code = self.categories.encode(credit_category)
+        credit_account_code = self.accounts.encode(credit_account)
+        self._reserve_accounts()
+
+        self.transaction_id[position] = transaction_id
+        self.date[position] = date_code
+        self.description.append(description)
+        self.debit_category[position] = debit_category_code
+        self.debit_account[position] = debit_account_code
+        self.debit_amount[position] = debit_amount
+        self.credit_category[position] = credit_category_code
+        self.credit_account[position] = credit_account_code
+        self.credit_amount[position] = credit_amount
+        self.size += 1
+
+        self.account_categories.setdefault((debit_category_code, debit_account_code), None)
+        self.account_categories.setdefault((credit_category_code, credit_account_code), None)
+        self.debit_totals[debit_account_code] += debit_amount
+        self.credit_totals[credit_account_code] += credit_amount
+        self.version += 1
+        self.account_versions[debit_account_code] = self.version
+        self.account_versions[credit_account_code] = self.version
+
+        self._track_lengths((transaction_id, date, description, debit_category, debit_account,
+                             self.from_minor(debit_amount), credit_category, credit_account,
+                             self.from_minor(credit_amount)))
+
+        day = int(self.date_days[date_code])
+        self.date_index.insert(day, position)
+        for account_code in {debit_account_code, credit_account_code}:
+            index = self.account_index.get(account_code)
+            if index is None:
+                index = self.account_index[account_code] = SortedIndex()
+            index.insert(day, position)
+
+        return position
+
+    def extend(self, transaction_id, date, description, debit_category, debit_account, debit_amount,
+               credit_category, credit_account, credit_amount) -> int:
+        """
+        Append many already validated entries given as columns (sequences or arrays, amounts in minor units) without
+        replaying them one by one - account totals, categories and indexes are updated in bulk. Returns the position
+        of the first entry
+        """
+        count = len(transaction_id)
+        start = self.size
+        if count == 0:
+            return start
+        dates = list(date)
+        date_codes = self._encode_dates(dates)
+        self._reserve(count)
+        stop = start + count
+
+        def encode(vocabulary: Vocabulary, values) -> np.ndarray:
+            mapping = {value: vocabulary.encode(value) for value in dict.fromkeys(values)}
+            return np.fromiter(map(mapping.__getitem__, values), dtype=np.int32, count=count)
+
+        self.transaction_id[start:stop] = transaction_id
+        self.date[start:stop] = date_codes
+        self.description.extend(description)
+        self.debit_category[start:stop] = encode(self.categories, debit_category)
+        self.debit_account[start:stop] = encode(self.accounts, debit_account)
+        self.debit_amount[start:stop] = debit_amount
+        self.credit_category[start:stop] = encode(self.categories, credit_category)
+        self.credit_account[start:stop] = encode(self.accounts, credit_account)
+        self.credit_amount[start:stop] = credit_amount
+        self.size = stop
+        self._reserve_accounts()
+
+        debit_accounts = self.debit_account[start:stop]
+        credit_accounts = self.credit_account[start:stop]
+
+        # (category, account) pairs in order of first posting, debit before credit per entry
+        pairs = np.stack([self.debit_category[start:stop].astype(np.int64) << 32 | debit_accounts,
+                          self.credit_category[start:stop].astype(np.int64) << 32 | credit_accounts], axis=1).ravel()
+        _, first = np.unique(pairs, return_index=True)
+        for pair in pairs[np.sort(first)].tolist():
+            self.account_categories.setdefault((pair >> 32, pair & 0xFFFFFFFF), None)
+
+        # bincount sums in float64, exact while an account's batch total stays below 2**53 minor units
+        minlength = len(self.debit_totals)
+        for accounts, amounts, totals in [(debit_accounts, self.debit_amount[start:stop], self.debit_totals),
+                                          (credit_accounts, self.credit_amount[start:stop], self.credit_totals)]:
+            totals += np.rint(np.bincount(accounts, weights=amounts, minlength=minlength)).astype(np.int64)
+        self.version += 1
+        self.account_versions[debit_accounts] = self.version
+        self.account_versions[credit_accounts] = self.version
+
+        columns = zip(self.fields, (self.transaction_id[start:stop].tolist(), dates, description,
+                                    debit_category, debit_account,
+                                    self.from_minor(self.debit_amount[start:stop]).tolist(),
+                                    credit_category, credit_account,
+                                    self.from_minor(self.credit_amount[start:stop]).tolist()))
+        for name, values in columns:
+            length = max(map(len, map(str, dict.fromkeys(values))))
+            if length > self.max_lengths[name]:
+                self.max_lengths[name] = length
+
+        positions = np.arange(start, stop, dtype=np.int64)
+        days = self.date_days[date_codes]
+        self.date_index.extend(days, positions)
+
+        # Entries per account (once if an entry debits and credits the same account), grouped by account code
+        distinct = credit_accounts != debit_accounts
+        accounts = np.concatenate([debit_accounts, credit_accounts[distinct]])
+        account_positions = np.concatenate([positions, positions[distinct]])
+        account_days = np.concatenate([days, days[distinct]])
+        order = np.lexsort((account_positions, accounts))
+        accounts, account_positions, account_days = accounts[order], account_positions[order], account_days[order]
+        boundaries = np.flatnonzero(np.diff(accounts)) + 1
+        for account, first, last in zip(accounts[np.r_[0, boundaries]].tolist(), np.r_[0, boundaries].tolist(),
+                                        np.r_[boundaries, len(accounts)].tolist()):
+            self.account_index.setdefault(account, SortedIndex()).extend(account_days[first:last],
+                                                                         account_positions[first:last])
+
+        return start
+
+    def _track_lengths(self, values: tuple):
+        """
+        Update the running max str() length per field with the values of one entry
+        """
+        max_lengths = self.max_lengths
+        for name, value in zip(self.fields, values):
+            length = len(str(value))
+            if length > max_lengths[name]:
+                max_lengths[name] = length
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Return the filled part of a numeric column (no copy)
+        """
+        return getattr(self, name)[:self.size]
+
+    def entry(self, position: int) -> dict:
+        """
+        Decode the entry at a position into the formatted journal entry dict
+        """
+        return {
+            'transaction_id': int(self.transaction_id[position]),
+            'date': self.dates.values[self.date[position]],
+            'description': self.description[position],
+            'debit_category': self.categories.values[self.debit_category[position]],
+            'debit_account': self.accounts.values[self.debit_account[position]],
+            'debit_amount': self.from_minor(int(self.debit_amount[position])),
+            'credit_category': self.categories.values[self.credit_category[position]],
+            'credit_account': self.accounts.values[self.credit_account[position]],
+            'credit_amount': self.from_minor(int(self.credit_amount[position]))
+        }
+
+    def iter_rows(self, first: int = 0, chunk_size: int = 10000, minor_units: bool = False):
+        """
+        Yield the entries from position "first" on as tuples of field values (in "fields" order), decoding one chunk
+        of columns at a time (amounts as currency amounts, or as minor units with minor_units=True)
+        """
+        for start in range(first, self.size, chunk_size):
+            stop = min(start + chunk_size, self.size)
+            debit_amounts = self.debit_amount[start:stop]
+            credit_amounts = self.credit_amount[start:stop]
+            if not minor_units:
+                debit_amounts, credit_amounts = self.from_minor(debit_amounts), self.from_minor(credit_amounts)
+            dates = self.dates.values
+            categories = self.categories.values
+            accounts = self.accounts.values
+            yield from zip(
+                self.transaction_id[start:stop].tolist(),
+                [dates[code] for code in self.date[start:stop].tolist()],
+                self.description[start:stop],
+                [categories[code] for code in self.debit_category[start:stop].tolist()],
+                [accounts[code] for code in self.debit_account[start:stop].tolist()],
+                debit_amounts.tolist(),
+                [categories[code] for code in self.credit_category[start:stop].tolist()],
+                [accounts[code] for code in self.credit_account[start:stop].tolist()],
+                credit_amounts.tolist()
+            )
+
+    def account_balance(self, account_name: str) -> int:
+        """
+        Debit minus credit total of an account in minor units (0 for unknown accounts)
+        """
+        code = self.accounts.get(account_name)
+        if code < 0:
+            return 0
+        return int(self.debit_totals[code] - self.credit_totals[code])
+
+    def date_positions(self, start: str | None = None, end: str | None = None) -> np.ndarray:
+        """
+        Positions of the entries dated between start and end (inclusive) in date order
+        """
+        return self.date_index.range(None if start is None else self.day_number(start),
+                                     None if end is None else self.day_number(end))
+
+    def account_positions(self, account_name: str, start: str | None = None, end: str | None = None) -> np.ndarray:
+        """
+        Positions of the entries debiting or crediting an account, dated between start and end, in date order
+        """
+        index = self.account_index.get(self.accounts.get(account_name))
+        if index is None:
+            return np.empty(0, dtype=np.int64)
+        return index.range(None if start is None else self.day_number(start),
+                           None if end is None else self.day_number(end))
+
+    def __len__(self):
+        return self.size
+
+
+class EntryView:
+    """
+    Lightweight read-only sequence of journal entry dicts, decoded on access from an EntryStore
+    """
+
+    def __init__(self, store: EntryStore, positions: np.ndarray | None = None):
+        self.store: EntryStore = store
+        self.positions: np.ndarray | None = positions  # None selects all entries of the store
+
+    def __len__(self):
+        return len(self.store) if self.positions is None else len(self.positions)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Journal entry index out of range.")
+        position = index if self.positions is None else int(self.positions[index])
+        return self.store.entry(position)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __eq__(self, other):
+        if isinstance(other, (EntryView, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(list(self))
@@ -0,0 +1,99 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+from data import Data
+from posting import post_frame
+
+
+def parse_source(filename: str, chunks, chunk_size: int = 50000) -> int:
+    """
+    Read and normalise a source into frames of at most chunk_size rows and put them one by one on the bounded chunks
+    queue, blocking while it is full, followed by None (runs in an executor worker). Returns the number of frames
+    """
+    frames: int = 0
+    try:
+        for frame in Data().iter_frames(filename, chunk_size=chunk_size):
+            chunks.put(frame)
+            frames += 1
+    finally:
+        chunks.put(None)
+    return frames
+
+
+async def iter_sources(sources: list, max_concurrency: int = 4, max_pending: int = 2, chunk_size: int = 50000,
+                       executor: Executor | None = None):
+    """
+    Parse many sources concurrently in an executor (a process pool of max_concurrency workers by default) and yield
+    (source, frame) in source order. At most max_concurrency sources are parsed at once and each of them hands its
+    frames over through a queue of at most max_pending frames, a worker that gets ahead of the consumer waits
+    (back-pressure per chunk), so at most max_concurrency * (max_pending + 1) frames are held at any time
+    """
+    loop = asyncio.get_running_loop()
+    own_executor: bool = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=max_concurrency)
+    manager = multiprocessing.Manager()  # Queue proxies can be passed to executor workers
+    semaphore = asyncio.Semaphore(max_concurrency)
+    started: asyncio.Queue = asyncio.Queue(maxsize=max_concurrency)
+
+    async def parse(source: str, chunks) -> int:
+        async with semaphore:
+            return await loop.run_in_executor(executor, parse_source, source, chunks, chunk_size)
+
+    async def schedule():
+        # Sources are started in order, so the one the consumer waits for is always running or done
+        for source in sources:
+            chunks = manager.Queue(maxsize=max_pending)
+            await started.put((source, chunks, asyncio.ensure_future(parse(source, chunks))))
+        await started.put(None)
+
+    async def next_frame(chunks, task):
+        # A task that fails before parse_source runs never ends its queue, its exception is raised instead
+        get = loop.run_in_executor(None, chunks.get)
+        await asyncio.wait([get, task], return_when=asyncio.FIRST_COMPLETED)
+        if not get.done() and task.exception() is not None:
+            raise task.exception()
+        return await get
+
+    scheduler = asyncio.ensure_future(schedule())
+    try:
+        while (item := await started.get()) is not None:
+            source, chunks, task = item
+            while (frame := await next_frame(chunks, task)) is not None:
+                yield source, frame
+            await task
+        await scheduler
+    finally:
+        scheduler.cancel()
+        while not started.empty():
+            item = started.get_nowait()
+            if item is not None:
+                item[2].cancel()
+        manager.shutdown()  # Workers still blocked on a full queue fail and return
+        if own_executor:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+async def ingest(sources: list, journal, max_concurrency: int = 4, max_pending: int = 2, chunk_size: int = 50000,
+                 executor: Executor | None = None, store=None, progress=None) -> int:
+    """
+    Post the rows of many sources into the journal in source order while the following sources are parsed (see
+    "iter_sources"), with a store only rows not imported yet. progress(source, rows_posted) is called after every
+    chunk. Returns the number of posted rows
+    """
+    rows_posted: int = 0
+    async for source, frame in iter_sources(sources, max_concurrency=max_concurrency, max_pending=max_pending,
+                                            chunk_size=chunk_size, executor=executor):
+        rows_posted += post_frame(frame, journal, store=store)
+        if progress is not None:
+            progress(source, rows_posted)
+
+    return rows_posted
+
+
+def ingest_sources(sources: list, journal, **kwargs) -> int:
+    """
+    Blocking "ingest" for callers without an event loop
+    """
+    return asyncio.run(ingest(sources, journal, **kwargs))
@@ -0,0 +1,208 @@
+import cProfile
+import functools
+import importlib
+import inspect
+import json
+import os
+import threading
+import time
+
+# (module, class, method, mode that instruments it, counter(instance, args, result) -> (name, increment) or None)
+TARGETS: list = [
+    ('data', 'Data', 'get_transactions_from_excel', 'summary', None),
+    ('data', 'Data', 'iter_frames', 'summary', None),
+    ('data', 'Data', 'normalise_frame', 'detailed', None),
+    ('data', 'Data', 'read_chunks', 'detailed', None),
+    ('entries', 'EntryStore', 'append', 'summary', lambda self, args, result: ('entries_posted', 1)),
+    ('entries', 'EntryStore', 'extend', 'summary', lambda self, args, result: ('entries_posted', self.size - result)),
+    ('entries', 'EntryStore', 'date_positions', 'detailed', None),
+    ('entries', 'EntryStore', 'account_positions', 'detailed', None),
+    ('transaction', 'Journal', 'add_transaction', 'summary', None),
+    ('transaction', 'Journal', 'add_transactions', 'summary', None),
+    ('transaction', 'Journal', 'load_entries', 'summary', None),
+    ('transaction', 'Journal', 'validate_batch', 'detailed', None),
+    ('transaction', 'Journal', 'adjust_journal_entry', 'summary', None),
+    ('transaction', 'Journal', 'adjust_journal_entries', 'summary', None),
+    ('transaction', 'Journal', 'verify', 'summary', lambda self, args, result: ('full_scans', 1)),
+    ('transaction', 'Journal', '_get_minor_account_balances', 'summary',
+     lambda self, args, result: ('balance_recomputations', 1)),
+    ('transaction', 'Journal', 'get_account_balances', 'summary', None),
+    ('transaction', 'Journal', 'get_category_balances', 'summary', None),
+    ('transaction', 'Journal', 'get_trial_balance', 'summary', None),
+    ('transaction', 'Journal', 'get_entries_by_date', 'detailed', None),
+    ('transaction', 'Journal', 'get_entries_between', 'detailed', None),
+    ('transaction', 'Journal', 'get_single_account_entries', 'detailed', None),
+    ('transaction', 'Journal', 'get_single_account_balance', 'detailed', None),
+    ('transaction', 'Journal', 'close_period', 'summary', None),
+    ('statements', 'FinancialStatements', 'income_statement', 'detailed', None),
+    ('statements', 'FinancialStatements', 'balance_sheet', 'detailed', None),
+    ('statements', 'FinancialStatements', 'cash_flow_statement', 'detailed', None),
+    ('visual', 'Visualization', 'export_to_excel', 'summary', None),
+    ('visual', 'Visualization', 'export_to_excel_streaming', 'summary', None),
+    ('visual', 'Visualization', 'export_to_excel_incremental', 'summary', None),
+    ('visual', 'Visualization', '_transactions_to_dataframe', 'summary',
+     lambda self, args, result: ('full_scans', 1)),
+    ('visual', 'Visualization', '_write_transactions_sheet_streaming', 'summary',
+     lambda self, args, result: ('cells_written', (self.journal.entry_store.size + 1) * len(self.columns))),
+    ('visual', 'Visualization', '_build_adjusted_trial_balance_sheet', 'summary',
+     lambda self, args, result: ('cells_written', len(args[0]._cells))),
+    ('visual', 'Visualization', '_build_statement_sheet', 'summary',
+     lambda self, args, result: ('cells_written', len(args[0]._cells)))
+]
+
+
+def current_rss() -> int:
+    """
+    Resident set size of this process in bytes (0 where /proc is not available)
+    """
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+class Instrumentation:
+    """
+    Timers, counters and (in detailed mode) peak memory and a cProfile of the hot paths of Data, Journal, EntryStore
+    and Visualization. "enable" patches the instrumented methods with timing wrappers and "disable" restores the
+    originals, so with mode "off" nothing is patched and the code runs untouched
+    """
+    modes: tuple = ('off', 'summary', 'detailed')
+
+    def __init__(self, mode: str = 'off', interval: float = 0.005):
+        if mode not in self.modes:
+            raise ValueError(f"Instrumentation mode must be one of {self.modes}, got {mode}.")
+        self.mode: str = mode
+        self.interval: float = interval  # RSS sampling interval in seconds (detailed mode)
+        self.stages: dict = {}  # "Class.method" -> {'calls', 'seconds', 'peak_mb'}
+        self.counters: dict = {}  # e.g. entries_posted, full_scans, balance_recomputations, cells_written
+        self.profiler: cProfile.Profile | None = None
+        self._originals: list = []  # (class, method name, original attribute) to restore
+        self._active: dict = {}  # Open stage records by id, updated by the RSS sampler
+        self._stop = threading.Event()
+        self._sampler: threading.Thread | None = None
+
+    def __enter__(self):
+        return self.enable()
+
+    def __exit__(self, *exc):
+        self.disable()
+        return False
+
+    def enable(self) -> "Instrumentation":
+        """
+        Patch the methods instrumented by the current mode (no-op for "off")
+        """
+        if self.mode == 'off' or self._originals:
+            return self
+
+        for module_name, class_name, method_name, mode, counter in TARGETS:
+            if mode == 'detailed' and self.mode != 'detailed':
+                continue
+            cls = getattr(importlib.import_module(module_name), class_name)
+            original = inspect.getattr_static(cls, method_name)
+            self._originals.append((cls, method_name, original))
+            setattr(cls, method_name, self._wrap(f"{class_name}.{method_name}", original, counter))
+
+        if self.mode == 'detailed':
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample, daemon=True)
+            self._sampler.start()
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        return self
+
+    def disable(self):
+        """
+        Restore the original methods and stop sampling and profiling
+        """
+        if self.profiler is not None:
+            self.profiler.disable()
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+
+        for cls, method_name, original in reversed(self._originals):
+            setattr(cls, method_name, original)
+        self._originals = []
+
+    def _wrap(self, name: str, original, counter):
+        """
+        Timing (and counting) wrapper of a plain, static or class method
+        """
+        function = original.__func__ if isinstance(original, (staticmethod, classmethod)) else original
+        detailed: bool = self.mode == 'detailed'
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            record = {'start_rss': current_rss(), 'peak_rss': 0} if detailed else None
+            if record is not None:
+                record['peak_rss'] = record['start_rss']
+                self._active[id(record)] = record
+            start = time.perf_counter()
+            try:
+                result = function(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                stage = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0})
+                stage['calls'] += 1
+                stage['seconds'] += seconds
+                if record is not None:
+                    del self._active[id(record)]
+                    peak_mb = (max(record['peak_rss'], current_rss()) - record['start_rss']) / 2 ** 20
+                    stage['peak_mb'] = max(stage.get('peak_mb', 0.0), round(peak_mb, 1))
+
+            if counter is not None:
+                instance = args[0] if not isinstance(original, staticmethod) else None
+                counted = counter(instance, args[1:] if instance is not None else args, result)
+                if counted is not None:
+                    self.counters[counted[0]] = self.counters.get(counted[0], 0) + counted[1]
+            return result
+
+        if isinstance(original, staticmethod):
+            return staticmethod(wrapper)
+        if isinstance(original, classmethod):
+            return classmethod(wrapper)
+        return wrapper
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            rss = current_rss()
+            for record in list(self._active.values()):
+                record['peak_rss'] = max(record['peak_rss'], rss)
+
+    def report(self) -> dict:
+        """
+        Stage timings (sorted by total time) and counters
+        """
+        stages = sorted(self.stages.items(), key=lambda item: item[1]['seconds'], reverse=True)
+        return {
+            'mode': self.mode,
+            'stages': {name: {**stage, 'seconds': round(stage['seconds'], 6)} for name, stage in stages},
+            'counters': dict(self.counters)
+        }
+
+    def summary(self) -> str:
+        """
+        The report as printable lines
+        """
+        lines: list = [f"{name:<55} {stage['calls']:>9} calls {stage['seconds']:>10.4f}s"
+                       + (f" {stage['peak_mb']:>8.1f} MB" if 'peak_mb' in stage else "")
+                       for name, stage in self.report()['stages'].items()]
+        lines += [f"{name:<55} {value:>9}" for name, value in self.counters.items()]
+        return "\n".join(lines)
+
+    def dump(self, filename: str):
+        """
+        Write the JSON report (.json) or the cProfile statistics for pstats (any other extension, detailed mode only)
+        """
+        if filename.lower().endswith('.json'):
+            with open(filename, 'w') as file:
+                json.dump(self.report(), file, indent=2)
+            return
+
+        if self.profiler is None:
+            raise ValueError("A cProfile dump needs the 'detailed' instrumentation mode.")
+        self.profiler.dump_stats(filename)
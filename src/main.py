@@ -1,45 +1,199 @@
-from transaction import Transaction, Journal
-from visual import Visualization
-from data import Data
+import argparse
+import sys
 
+# Only the standard library is imported here, every command imports what it needs (pandas, numpy and openpyxl load
+# only for the commands that read workbooks, post or export, a balance lookup runs on sqlite3 alone)
 
-def embed_transactions(transactions: dict, journal):
-    txn_list: list = []
 
-    for key, value in transactions.items():
-        txn = Transaction(date=value['date'], description=value['description'])
-        txn.add_entry(debit_category=value['debit_category'], debit_account_name=value['debit_account_name'],
-                      debit_amount=value['debit_amount'],
-                      credit_category=value['credit_category'], credit_account_name=value['credit_account_name'],
-                      credit_amount=value['credit_amount'])
-        journal.add_transaction(txn)
-        txn_list.append(txn)
+def open_journal(store: "JournalStore", args):
+    """
+    Load the entity's current journal, or start it for the given period
+    """
+    from transaction import Journal
 
-    return txn_list
+    journal = store.load(args.entity)
+    if journal is None:
+        if not (args.start_date and args.end_date):
+            raise SystemExit(f"No journal for {args.entity} yet, pass --start-date and --end-date to start one.")
+        journal = Journal(journal_name=args.entity, start_date=args.start_date, end_date=args.end_date)
+    return journal
 
 
-def main():
-    journal = Journal(journal_name='Company XYZ', start_date='2025-10-01', end_date='2025-10-31')
+def entry_arguments(args) -> dict:
+    return dict(debit_category=args.debit_category, debit_account_name=args.debit_account, debit_amount=args.amount,
+                credit_category=args.credit_category, credit_account_name=args.credit_account,
+                credit_amount=args.amount)
 
-    data = Data()
-    data.get_transactions_from_excel()
-    transactions = data.transactions
 
-    embed_transactions(transactions, journal=journal)
+def import_command(store: "JournalStore", args):
+    journal = open_journal(store, args)
+    if len(args.sources) == 1:
+        from posting import stream_transactions
+        rows: int = stream_transactions(args.sources[0], journal, chunk_size=args.chunk_size, store=store)
+    else:
+        from ingest import ingest_sources
+        rows = ingest_sources(args.sources, journal, max_concurrency=args.workers, chunk_size=args.chunk_size,
+                              store=store)
+    store.save(journal)
+    print(f"Imported {rows} new transactions into {journal.journal_name}.")
 
-    journal.adjust_journal_entry(
-        adjustment_date='2025-10-31',
-        description='Adjustment: Recognize earned revenue from unearned revenue contract',  # txn6 $4,800/6 (1/6 months)
-        debit_category='Liability',
-        debit_account_name='Unearned revenue',
-        debit_amount=800,
-        credit_category='Equity',
-        credit_account_name='Service revenue',
-        credit_amount=800
-    )
 
-    exporter = Visualization(transactions=journal.transactions, journal=journal)
-    exporter.export_to_excel(f"{journal.journal_name}.xlsx")
+def post_command(store: "JournalStore", args):
+    from transaction import Transaction
+
+    journal = open_journal(store, args)
+    txn = Transaction(date=args.date, description=args.description)
+    txn.add_entry(**entry_arguments(args), minor_factor=journal.entry_store.minor_factor)
+    journal.add_transaction(txn)
+    store.save(journal)
+    print(f"Posted transaction {txn.transaction_id}.")
+
+
+def adjust_command(store: "JournalStore", args):
+    journal = open_journal(store, args)
+    if args.schedules:
+        import pandas as pd
+        from schedule import AdjustmentScheduler
+
+        reader = pd.read_csv if args.schedules.lower().endswith('.csv') else pd.read_excel
+        scheduler = AdjustmentScheduler(currency_scale=journal.entry_store.currency_scale,
+                                        cache=store.schedule_cache(journal.journal_name))
+        scheduler.update(reader(args.schedules))
+        store.save_schedule_cache(journal.journal_name, scheduler.cache)
+        posted = store.posted_adjustments(journal.journal_name, journal.start_date, journal.end_date)
+        scheduler.post(journal, skip=posted)
+        store.save(journal, adjustments=scheduler.posted)
+        print(f"Posted {len(scheduler.posted)} scheduled adjustments, skipped {len(posted)} already posted "
+              f"({scheduler.recomputed} schedules recomputed).")
+    else:
+        missing: list = [f"--{name.replace('_', '-')}" for name in ['description', 'debit_category', 'debit_account',
+                                                                   'credit_category', 'credit_account', 'amount']
+                         if getattr(args, name) is None]
+        if missing:
+            raise SystemExit(f"Pass the adjusting entry ({', '.join(missing)} missing) or --schedules.")
+        journal.adjust_journal_entry(adjustment_date=args.date or journal.end_date, description=args.description,
+                                     **entry_arguments(args))
+        print("Posted 1 adjustment.")
+    store.save(journal)
+
+
+def balance_command(store: "JournalStore", args):
+    try:
+        balances: dict = store.account_balances(args.entity, args.accounts or None)
+    except KeyError as error:
+        raise SystemExit(error.args[0])
+    scale: int = store.currency_scale(args.entity)
+    for account, balance in balances.items():
+        print(f"{account}\t{balance:.{scale}f}")
+
+
+def export_command(store: "JournalStore", args):
+    from visual import Visualization
+
+    journal = store.load(args.entity)
+    if journal is None:
+        raise SystemExit(f"No journal named {args.entity} is stored.")
+    output: str = args.output or f"{journal.journal_name} {journal.start_date} {journal.end_date}.xlsx"
+    visualization = Visualization(transactions=journal.transactions, journal=journal)
+    if args.incremental:
+        print(f"Exported {output} ({visualization.export_to_excel_incremental(output, statements=args.statements)}).")
+        return
+    visualization.export_to_excel(output, streaming=True, statements=args.statements)
+    print(f"Exported {output}.")
+
+
+def close_command(store: "JournalStore", args):
+    journal = store.load(args.entity)
+    if journal is None:
+        raise SystemExit(f"No journal named {args.entity} is stored.")
+    next_journal = journal.close_period(retained_earnings_account=args.retained_earnings,
+                                        next_start_date=args.next_start_date, next_end_date=args.next_end_date)
+    store.archive(journal.journal_name, f"{journal.journal_name} {journal.start_date} {journal.end_date}")
+    store.save(next_journal)
+    print(f"Closed {journal.start_date} to {journal.end_date}, "
+          f"opened {next_journal.start_date} to {next_journal.end_date}.")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Accounting cycle: import, post, adjust, query, export and close")
+    parser.add_argument('--database', default='journal.db', help="SQLite journal store (default: journal.db)")
+    parser.add_argument('--entity', default='Company XYZ', help="Journal (company) name")
+    parser.add_argument('--instrument', choices=['off', 'summary', 'detailed'], default='off',
+                        help="Collect timers and counters of the run")
+    parser.add_argument('--report', help="Write the instrumentation report (.json) or cProfile stats (other)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def period(command):
+        command.add_argument('--start-date', help="Period start of a new journal (YYYY-MM-DD)")
+        command.add_argument('--end-date', help="Period end of a new journal (YYYY-MM-DD)")
+
+    def entry(command, required: bool):
+        command.add_argument('--date', required=required, help="Date (YYYY-MM-DD)")
+        command.add_argument('--description', required=required)
+        for side in ['debit', 'credit']:
+            command.add_argument(f'--{side}-category', choices=['Asset', 'Liability', 'Equity'], required=required)
+            command.add_argument(f'--{side}-account', required=required)
+        command.add_argument('--amount', type=float, required=required)
+
+    command = commands.add_parser('import', help="Import new rows of CSV, Parquet or Excel sources (in order)")
+    command.add_argument('sources', nargs='+')
+    command.add_argument('--chunk-size', type=int, default=50000)
+    command.add_argument('--workers', type=int, default=4, help="Sources parsed concurrently")
+    period(command)
+    command.set_defaults(handler=import_command)
+
+    command = commands.add_parser('post', help="Post one transaction")
+    entry(command, required=True)
+    period(command)
+    command.set_defaults(handler=post_command)
+
+    command = commands.add_parser('adjust', help="Post an adjusting entry or the scheduled adjustments of the period")
+    entry(command, required=False)
+    command.add_argument('--schedules', help="CSV or Excel file of adjustment schedules")
+    period(command)
+    command.set_defaults(handler=adjust_command)
+
+    command = commands.add_parser('balance', help="Print account balances (all accounts if none are given)")
+    command.add_argument('accounts', nargs='*')
+    command.set_defaults(handler=balance_command)
+
+    command = commands.add_parser('export', help="Export the journal and trial balance to Excel")
+    command.add_argument('--output', help="Workbook name (default: entity and period)")
+    command.add_argument('--statements', action='store_true', help="Add the financial statements")
+    command.add_argument('--incremental', action='store_true',
+                         help="Only append new entries to (and refresh the balances of) an earlier export")
+    command.set_defaults(handler=export_command)
+
+    command = commands.add_parser('close', help="Close the period and open the next one")
+    command.add_argument('--retained-earnings', default="Retained earnings")
+    command.add_argument('--next-start-date')
+    command.add_argument('--next-end-date')
+    command.set_defaults(handler=close_command)
+
+    return parser
+
+
+def main(argv: list | None = None):
+    args = build_parser().parse_args(argv)
+
+    from storage import JournalStore
+
+    instrumentation = None
+    if args.instrument != 'off':
+        from instrumentation import Instrumentation
+        instrumentation = Instrumentation(mode=args.instrument).enable()
+
+    store = JournalStore(args.database)
+    try:
+        args.handler(store, args)
+    finally:
+        store.close()
+        if instrumentation is not None:
+            instrumentation.disable()
+            if args.report:
+                instrumentation.dump(args.report)
+            else:
+                print(instrumentation.summary(), file=sys.stderr)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,55 @@
+from typing import TYPE_CHECKING
+
+from data import Data
+from transaction import Transaction, Journal
+
+if TYPE_CHECKING:
+    from storage import JournalStore
+
+
+def embed_transactions(transactions: dict, journal: Journal) -> list:
+    """
+    Post the rows of "Data.transactions" one Transaction at a time, returns the Transaction objects
+    """
+    txn_list: list = []
+
+    for key, value in transactions.items():
+        txn = Transaction(date=value['date'], description=value['description'])
+        txn.add_entry(debit_category=value['debit_category'], debit_account_name=value['debit_account_name'],
+                      debit_amount=value['debit_amount'],
+                      credit_category=value['credit_category'], credit_account_name=value['credit_account_name'],
+                      credit_amount=value['credit_amount'], minor_factor=journal.entry_store.minor_factor)
+        journal.add_transaction(txn)
+        txn_list.append(txn)
+
+    return txn_list
+
+
+def post_frame(frame, journal: Journal, store: "JournalStore | None" = None) -> int:
+    """
+    Post a normalised chunk (see "Data.iter_frames") through the bulk path, with a store only the rows not imported
+    yet, which are saved together with their fingerprints. Returns the number of posted rows
+    """
+    if store is not None:
+        frame = frame[store.unseen(journal.journal_name, frame['fingerprint'])]
+    if len(frame):
+        journal.add_transactions(frame)
+    if store is not None:
+        store.save(journal, fingerprints=frame['fingerprint'])
+    return len(frame)
+
+
+def stream_transactions(filename: str, journal: Journal, chunk_size: int = 50000, progress=None,
+                        store: "JournalStore | None" = None) -> int:
+    """
+    Read a CSV, Parquet or Excel source in chunks of chunk_size rows and post each chunk into the journal right away
+    (memory stays bounded by the chunk size), progress(rows_posted) is called after every chunk. With a store, rows
+    already imported into the stored journal are skipped and every chunk is saved with its fingerprints
+    """
+    rows_posted: int = 0
+    for frame in Data().iter_frames(filename, chunk_size=chunk_size):
+        rows_posted += post_frame(frame, journal, store=store)
+        if progress is not None:
+            progress(rows_posted)
+
+    return rows_posted
@@ -0,0 +1,193 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from transaction import Journal
+from entries import EntryView
+
+
+class Reconciliation:
+    """
+    Matches bank statement lines to the journal entries of one cash account. Exact matches on (amount, date) come
+    from a hash join, the remaining lines are matched within an amount and date tolerance window through binary
+    searches on a sorted (date, amount) key, one per day of the date tolerance window. A deposit (positive amount)
+    matches a debit to the cash account, a withdrawal a credit
+    """
+
+    def __init__(self, journal: Journal, cash_account: str = "Cash"):
+        self.journal: Journal = journal
+        self.cash_account: str = cash_account
+
+    @staticmethod
+    def load_statement(filename: str) -> pd.DataFrame:
+        """
+        Read a CSV or Excel bank statement with a Date column and either a signed Amount column or Deposit and
+        Withdrawal columns into a DataFrame with date, amount and description
+        """
+        extension = os.path.splitext(filename)[1].lower()
+        if extension == '.csv':
+            df = pd.read_csv(filename)
+        elif extension in ('.xlsx', '.xlsm'):
+            df = pd.read_excel(filename)
+        else:
+            raise ValueError(f"Unsupported statement format {extension}, use .csv or .xlsx.")
+
+        if 'Amount' in df.columns:
+            amount = df['Amount'].astype(float)
+        elif 'Deposit' in df.columns and 'Withdrawal' in df.columns:
+            amount = df['Deposit'].astype(float).fillna(0.0) - df['Withdrawal'].astype(float).fillna(0.0)
+        else:
+            raise ValueError(f"{filename} needs an Amount column or Deposit and Withdrawal columns.")
+        if 'Date' not in df.columns:
+            raise ValueError(f"{filename} is missing the column ['Date'].")
+
+        return pd.DataFrame({
+            'date': pd.to_datetime(df['Date']).dt.strftime('%Y-%m-%d'),
+            'amount': amount,
+            'description': df['Description'].astype(str) if 'Description' in df.columns else ""
+        })
+
+    def _cash_entries(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Positions, signed minor amounts and days (since 1970-01-01) of the entries posting to the cash account
+        (transfers from the account to itself are left out)
+        """
+        store = self.journal.entry_store
+        code = store.accounts.get(self.cash_account)
+        debit_account, credit_account = store.column('debit_account'), store.column('credit_account')
+        debits = np.flatnonzero((debit_account == code) & (credit_account != code))
+        credits = np.flatnonzero((credit_account == code) & (debit_account != code))
+
+        positions = np.concatenate([debits, credits])
+        amounts = np.concatenate([store.column('debit_amount')[debits], -store.column('credit_amount')[credits]])
+        days = store.date_days[store.column('date')[positions]]
+
+        order = np.argsort(positions, kind='stable')
+        return positions[order], amounts[order], days[order]
+
+    @staticmethod
+    def _key_space(amounts: list, days: list, amount_tolerance: int, date_tolerance: int) -> tuple[int, int, int]:
+        """
+        Smallest amount, number of distinct amounts and smallest day covered by the arrays plus the tolerance windows
+        (the origin and stride of the date-major sort key)
+        """
+        amount_low = min(int(values.min()) for values in amounts) - amount_tolerance
+        amount_span = max(int(values.max()) for values in amounts) + amount_tolerance - amount_low + 1
+        day_low = min(int(values.min()) for values in days) - date_tolerance
+        day_span = max(int(values.max()) for values in days) + date_tolerance - day_low + 1
+        if amount_span * day_span >= 1 << 63:
+            raise ValueError("The amounts and dates span too wide a range to reconcile.")
+        return amount_low, amount_span, day_low
+
+    @staticmethod
+    def _keys(amounts: np.ndarray, days: np.ndarray, key_space: tuple[int, int, int]) -> np.ndarray:
+        """
+        Sort key ordering by date, then by amount
+        """
+        amount_low, amount_span, day_low = key_space
+        return (days - day_low) * amount_span + (amounts - amount_low)
+
+    def reconcile(self, statement, amount_tolerance: float = 0.0, date_tolerance: int = 3) -> dict:
+        """
+        Reconcile a statement (file name or DataFrame with date, amount and description) against the cash account.
+        Returns DataFrames "matched" (statement row, entry position, transaction id, exact or fuzzy),
+        "ambiguous" (statement rows with several candidate entries, or whose only candidate is claimed by another row),
+        "unmatched_statement", the "unmatched_entries" (EntryView) and "summary" counts
+        """
+        if isinstance(statement, str):
+            statement = self.load_statement(statement)
+        store = self.journal.entry_store
+
+        positions, entry_amounts, entry_days = self._cash_entries()
+        line_amounts = store.to_minor_array(statement['amount'])
+        line_days = pd.to_datetime(statement['date']).to_numpy(dtype='datetime64[D]').astype(np.int64)
+        lines = np.arange(len(statement))
+
+        # 1. Exact: hash join on (amount, date), the k-th duplicate line takes the k-th duplicate entry
+        entries = pd.DataFrame({'amount': entry_amounts, 'day': entry_days, 'entry': np.arange(len(positions))})
+        bank = pd.DataFrame({'amount': line_amounts, 'day': line_days, 'line': lines})
+        entries['ordinal'] = entries.groupby(['amount', 'day']).cumcount()
+        bank['ordinal'] = bank.groupby(['amount', 'day']).cumcount()
+        exact = bank.merge(entries, on=['amount', 'day', 'ordinal'], how='inner')
+        exact_lines, exact_entries = exact['line'].to_numpy(), exact['entry'].to_numpy()
+
+        # 2. Fuzzy: for every day of the date window, binary search of the amount window on the (date, amount) sorted
+        # keys of the open entries (the cost does not depend on the amount tolerance)
+        line_open = np.ones(len(statement), dtype=bool)
+        entry_open = np.ones(len(positions), dtype=bool)
+        line_open[exact_lines] = False
+        entry_open[exact_entries] = False
+        open_entries, open_lines = np.flatnonzero(entry_open), np.flatnonzero(line_open)
+
+        candidate_lines, candidate_entries = [], []
+        tolerance = store.to_minor(amount_tolerance)
+        offsets = range(-date_tolerance, date_tolerance + 1) if len(open_entries) and len(open_lines) else range(0)
+        if offsets:
+            key_space = self._key_space([entry_amounts, line_amounts], [entry_days, line_days], tolerance,
+                                        date_tolerance)
+            order = np.argsort(self._keys(entry_amounts[open_entries], entry_days[open_entries], key_space),
+                               kind='stable')
+            open_entries = open_entries[order]
+            sorted_keys = self._keys(entry_amounts[open_entries], entry_days[open_entries], key_space)
+        for offset in offsets:
+            days = line_days[open_lines] + offset
+            amounts = line_amounts[open_lines]
+            low = np.searchsorted(sorted_keys, self._keys(amounts - tolerance, days, key_space), 'left')
+            high = np.searchsorted(sorted_keys, self._keys(amounts + tolerance, days, key_space), 'right')
+            counts = high - low
+            candidate_lines.append(np.repeat(open_lines, counts))
+            steps = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            candidate_entries.append(open_entries[np.repeat(low, counts) + steps])
+        candidate_lines = np.concatenate(candidate_lines) if candidate_lines else np.zeros(0, dtype=np.int64)
+        candidate_entries = np.concatenate(candidate_entries) if candidate_entries else np.zeros(0, dtype=np.int64)
+
+        # A candidate pair is a match if neither its line nor its entry has any other candidate
+        line_counts = np.bincount(candidate_lines, minlength=len(statement))
+        entry_counts = np.bincount(candidate_entries, minlength=len(positions))
+        unique = (line_counts[candidate_lines] == 1) & (entry_counts[candidate_entries] == 1)
+        fuzzy_lines, fuzzy_entries = candidate_lines[unique], candidate_entries[unique]
+
+        # Candidate positions per ambiguous line, grouped by one sort instead of a per-group aggregation
+        ambiguous_lines, ambiguous_positions = candidate_lines[~unique], positions[candidate_entries[~unique]]
+        order = np.lexsort((ambiguous_positions, ambiguous_lines))
+        ambiguous_lines, ambiguous_positions = ambiguous_lines[order], ambiguous_positions[order]
+        starts = np.flatnonzero(np.diff(ambiguous_lines, prepend=-1))
+        ambiguous = pd.DataFrame({
+            'line': ambiguous_lines[starts],
+            'candidates': [group.tolist() for group in np.split(ambiguous_positions, starts[1:])] if len(starts) else []
+        })
+
+        matched_lines = np.concatenate([exact_lines, fuzzy_lines])
+        matched_entries = np.concatenate([exact_entries, fuzzy_entries])
+        matched = pd.DataFrame({
+            'line': matched_lines,
+            'position': positions[matched_entries],
+            'transaction_id': store.column('transaction_id')[positions[matched_entries]],
+            'match': ['exact'] * len(exact_lines) + ['fuzzy'] * len(fuzzy_lines),
+            'amount': store.from_minor(line_amounts[matched_lines]),
+            'statement_date': statement['date'].to_numpy()[matched_lines],
+            'entry_date': np.array(store.dates.values, dtype=object)[store.column('date')[positions[matched_entries]]]
+        }).sort_values('line', ignore_index=True)
+
+        # Whatever has no candidate at all is unmatched
+        line_open[candidate_lines] = False
+        entry_open[candidate_entries] = False
+        unmatched_lines = np.flatnonzero(line_open)
+        unmatched_positions = positions[np.flatnonzero(entry_open)]
+
+        return {
+            'matched': matched,
+            'ambiguous': ambiguous,
+            'unmatched_statement': statement.iloc[unmatched_lines].assign(line=unmatched_lines),
+            'unmatched_entries': EntryView(store, unmatched_positions),
+            'summary': {
+                'statement_lines': len(statement),
+                'cash_entries': len(positions),
+                'exact': len(exact_lines),
+                'fuzzy': len(fuzzy_lines),
+                'ambiguous': len(ambiguous),
+                'unmatched_statement': len(unmatched_lines),
+                'unmatched_entries': len(unmatched_positions)
+            }
+        }
@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+
+from transaction import Journal
+
+
+class AdjustmentScheduler:
+    """
+    Computes the period adjustments of many accrual, deferral and depreciation schedules in one vectorized pass.
+    A schedule recognises "amount" from start_date to end_date with one of the methods
+
+    - "straight_line": equal amounts per calendar month (the start month counts as a full month)
+    - "daily": pro-rata by days elapsed
+    - "declining_balance": book value (amount) times the monthly rate (annual "rate" / 12, default double-declining
+      2 / useful life in years) down to "salvage", the remainder is recognised in the last month
+
+    The cumulative amount recognised at every month end is cached per schedule (in minor units), only new or changed
+    schedules are recomputed by "update". Pass a cache kept from an earlier run (e.g. "JournalStore.schedule_cache")
+    to carry it across runs
+    """
+    fields: tuple = ('schedule_id', 'method', 'start_date', 'end_date', 'amount', 'rate', 'salvage', 'description',
+                     'debit_category', 'debit_account_name', 'credit_category', 'credit_account_name')
+    methods: tuple = ('straight_line', 'daily', 'declining_balance')
+
+    def __init__(self, currency_scale: int = 2, cache: dict | None = None):
+        self.minor_factor: int = 10 ** currency_scale
+        self.schedules: pd.DataFrame = pd.DataFrame(columns=list(self.fields))  # Current schedules by schedule_id
+        # {schedule_id: (fingerprint, first month, cumulative minor amounts per month end)}
+        self.cache: dict = dict(cache) if cache is not None else {}
+        self.recomputed: int = 0  # Schedules recomputed by the last "update"
+        self.posted: list = []  # Schedule ids posted by the last "post"
+        self._lookup: tuple | None = None  # Flat arrays of the cached schedules for vectorized period lookups
+
+    @classmethod
+    def normalise_schedules(cls, schedules) -> pd.DataFrame:
+        """
+        Schedules as a DataFrame (from a DataFrame, dict of columns or list of dicts) with all fields, indexed by
+        schedule_id
+        """
+        df = pd.DataFrame(schedules).reindex(columns=list(cls.fields))
+        df['method'] = df['method'].fillna('straight_line')
+        df['rate'] = pd.to_numeric(df['rate']).astype(float)
+        df['salvage'] = pd.to_numeric(df['salvage']).fillna(0.0).astype(float)
+        df['amount'] = pd.to_numeric(df['amount']).astype(float)
+        df['start_date'] = pd.to_datetime(df['start_date']).dt.strftime('%Y-%m-%d')
+        df['end_date'] = pd.to_datetime(df['end_date']).dt.strftime('%Y-%m-%d')
+        df['description'] = df['description'].fillna(df['schedule_id'].astype(str) + ' ' + df['method'])
+
+        unknown = ~df['method'].isin(cls.methods)
+        if unknown.any():
+            raise ValueError(f"Unknown schedule method(s) {sorted(set(df.loc[unknown, 'method']))}, "
+                             f"must be one of {cls.methods}.")
+        if (df['end_date'] < df['start_date']).any():
+            raise ValueError("Schedule end_date must not be before start_date.")
+        if df['schedule_id'].duplicated().any():
+            raise ValueError("Schedule ids must be unique.")
+
+        return df.set_index('schedule_id', drop=False)
+
+    def update(self, schedules) -> int:
+        """
+        Replace the schedules, recompute only the new or changed ones (dropped schedules leave the cache), returns the
+        number of recomputed schedules
+        """
+        df = self.normalise_schedules(schedules)
+        fingerprints = pd.util.hash_pandas_object(df[list(self.fields)], index=False).to_numpy().view(np.int64)
+
+        changed = np.array([self.cache.get(schedule_id, (None,))[0] != fingerprint
+                            for schedule_id, fingerprint in zip(df.index, fingerprints.tolist())], dtype=bool)
+        self.cache = {schedule_id: self.cache[schedule_id] for schedule_id in df.index if schedule_id in self.cache}
+        if changed.any():
+            first_months, cumulative = self._compute(df[changed])
+            for schedule_id, fingerprint, first_month, amounts in zip(
+                    df.index[changed], fingerprints[changed].tolist(), first_months.tolist(), cumulative):
+                self.cache[schedule_id] = (fingerprint, first_month, amounts)
+
+        self.schedules = df
+        self._lookup = None
+        self.recomputed = int(changed.sum())
+        return self.recomputed
+
+    def _compute(self, df: pd.DataFrame) -> tuple[np.ndarray, list]:
+        """
+        Cumulative minor amounts at every month end of the given schedules, computed for all of them at once over a
+        flat (ragged) array of schedule months
+        """
+        start = df['start_date'].to_numpy(dtype='datetime64[D]')
+        end = df['end_date'].to_numpy(dtype='datetime64[D]')
+        first_month = start.astype('datetime64[M]')
+        months = (end.astype('datetime64[M]') - first_month).astype(np.int64) + 1
+        amount = df['amount'].to_numpy()
+        salvage = df['salvage'].to_numpy()
+        method = df['method'].to_numpy()
+
+        row = np.repeat(np.arange(len(df)), months)
+        offset = np.arange(months.sum()) - np.repeat(np.cumsum(months) - months, months)
+        month_end = (first_month[row] + offset + 1).astype('datetime64[D]') - 1
+
+        # Straight-line: share of elapsed calendar months
+        cumulative = amount[row] * (offset + 1) / months[row]
+
+        # Daily pro-rata: share of elapsed days
+        total_days = (end - start).astype(np.int64) + 1
+        elapsed_days = np.clip((np.minimum(month_end, end[row]) - start[row]).astype(np.int64) + 1, 0, None)
+        daily = method[row] == 'daily'
+        cumulative[daily] = (amount[row] * elapsed_days / total_days[row])[daily]
+
+        # Declining balance: constant monthly rate on the book value, floored at salvage and trued up at the end
+        rate = df['rate'].to_numpy().copy()
+        rate[np.isnan(rate)] = (2 / (months / 12))[np.isnan(rate)]
+        declining = method[row] == 'declining_balance'
+        depreciable = amount[row] - salvage[row]
+        book_value = amount[row] * (1 - np.minimum(rate[row] / 12, 1)) ** (offset + 1)
+        declined = np.where(offset + 1 == months[row], depreciable, np.minimum(amount[row] - book_value, depreciable))
+        cumulative[declining] = declined[declining]
+
+        # Rounding the cumulative amount (not every month's share) keeps the schedule summing exactly to its total
+        cumulative_minor = np.rint(cumulative * self.minor_factor).astype(np.int64)
+        return first_month.astype(np.int64), np.split(cumulative_minor, np.cumsum(months)[:-1])
+
+    def _cumulative_at(self, month: np.int64) -> np.ndarray:
+        """
+        Cumulative minor amount recognised by every schedule at the end of a month (months since 1970-01)
+        """
+        if self._lookup is None:  # Flatten the cached schedules once per update
+            entries: list = [self.cache[schedule_id] for schedule_id in self.schedules.index]
+            first_months = np.array([first_month for _, first_month, _ in entries], dtype=np.int64)
+            lengths = np.array([len(amounts) for _, _, amounts in entries], dtype=np.int64)
+            flat = np.concatenate([amounts for _, _, amounts in entries]) if entries else np.zeros(0, dtype=np.int64)
+            self._lookup = (first_months, lengths, np.cumsum(lengths) - lengths, flat)
+
+        first_months, lengths, starts, flat = self._lookup
+        elapsed = month - first_months
+        positions = starts + np.clip(elapsed, 0, lengths - 1)
+        return np.where(elapsed >= 0, flat[positions] if len(flat) else 0, 0)
+
+    def adjustments(self, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        Adjusting entries of all schedules for the calendar months from start_date to end_date, dated end_date, in the
+        column layout of "Journal.add_transactions" (schedules with nothing to recognise are left out)
+        """
+        first = np.datetime64(start_date, 'M').astype(np.int64)
+        last = np.datetime64(end_date, 'M').astype(np.int64)
+        amounts = self._cumulative_at(last) - self._cumulative_at(first - 1)
+
+        posted = amounts != 0
+        df = self.schedules[posted]
+        return pd.DataFrame({
+            'date': end_date,
+            'description': df['description'].to_numpy(),
+            'debit_category': df['debit_category'].to_numpy(),
+            'debit_account_name': df['debit_account_name'].to_numpy(),
+            'debit_amount': amounts[posted] / self.minor_factor,
+            'credit_category': df['credit_category'].to_numpy(),
+            'credit_account_name': df['credit_account_name'].to_numpy(),
+            'credit_amount': amounts[posted] / self.minor_factor
+        }, index=df.index)
+
+    def post(self, journal: Journal, skip=()) -> np.ndarray:
+        """
+        Post the adjustments of the journal's period in one batch, leaving out the schedule ids in skip (e.g. already
+        posted for the period, see "JournalStore.posted_adjustments"), returns the assigned transaction ids
+        """
+        batch: pd.DataFrame = self.adjustments(journal.start_date, journal.end_date)
+        batch = batch[~batch.index.isin(list(skip))]
+        self.posted = batch.index.tolist()
+        if batch.empty:
+            return np.array([], dtype=np.int64)
+        return journal.adjust_journal_entries(batch)
@@ -0,0 +1,200 @@
+import numpy as np
+
+
+class FinancialStatements:
+    """
+    Income statement, balance sheet and cash-flow statement of a journal, built from one shared aggregate layer.
+    Every result is memoised with the entry store version it was built at and only rebuilt after a posting touched
+    one of the accounts it depends on (see "EntryStore.account_versions"). Results are shared, do not modify them
+    """
+    cash_keywords: tuple = ('cash', 'bank')
+    investing_keywords: tuple = ('equipment', 'property', 'building', 'land', 'vehicle', 'machinery', 'furniture',
+                                 'investment', 'intangible', 'accumulated depreciation')
+    financing_keywords: tuple = ('notes payable', 'loan', 'bond', 'mortgage', 'capital', 'stock', 'dividend',
+                                 'drawing', 'withdrawal')
+
+    def __init__(self, journal):
+        self.journal = journal
+        self._cache: dict = {}  # Statement name -> (store version, result)
+        self._cash_flow_position: int = 0  # Entries folded into "_cash_flows" so far
+        self._cash_flows = np.zeros(16, dtype=np.int64)  # Net cash received per counterpart account code (minor)
+
+    def is_cash_account(self, category: str, account_name: str) -> bool:
+        name = account_name.lower()
+        return category == "Asset" and any(keyword in name for keyword in self.cash_keywords)
+
+    def cash_flow_activity(self, category: str, account_name: str) -> str:
+        """
+        Classify the counterpart account of a cash movement as "operating", "investing" or "financing"
+        """
+        name = account_name.lower()
+        if self.journal.is_income_statement_account(category, account_name):
+            return 'operating'
+        if category == "Asset" and any(keyword in name for keyword in self.investing_keywords):
+            return 'investing'
+        if category != "Asset" and any(keyword in name for keyword in self.financing_keywords):
+            return 'financing'
+        return 'operating'
+
+    def _account_codes(self, predicate) -> np.ndarray:
+        """
+        Codes of the posted accounts for which predicate(category, account_name) holds
+        """
+        store = self.journal.entry_store
+        return np.array([account_code for category_code, account_code in store.account_categories
+                         if predicate(store.categories.values[category_code], store.accounts.values[account_code])],
+                        dtype=np.int64)
+
+    def _memoised(self, name: str, build, accounts: np.ndarray | None = None):
+        """
+        Return the cached result of build() unless a posting since it was built touched one of the account codes it
+        depends on (all accounts if None)
+        """
+        store = self.journal.entry_store
+        cached = self._cache.get(name)
+        if cached is not None:
+            version, result = cached
+            touched = store.account_versions[:len(store.accounts)] > version
+            if not (touched if accounts is None else touched[accounts]).any():
+                self._cache[name] = (store.version, result)
+                return result
+
+        result = build()
+        self._cache[name] = (store.version, result)
+        return result
+
+    def minor_balances(self) -> dict:
+        """
+        Shared aggregate layer: all account balances by category in minor units
+        """
+        return self._memoised('minor_balances', self.journal._get_minor_account_balances)
+
+    def account_balances(self) -> dict:
+        """
+        Memoised "Journal.get_account_balances"
+        """
+        def build() -> dict:
+            self.journal._check_balance()
+            from_minor = self.journal.entry_store.from_minor
+            return {category: {account: from_minor(balance) for account, balance in accounts.items()}
+                    for category, accounts in self.minor_balances().items()}
+
+        return self._memoised('account_balances', build)
+
+    def income_statement(self) -> dict:
+        """
+        Revenues and expenses of the period (both positive) and the net income
+        """
+        def build() -> dict:
+            from_minor = self.journal.entry_store.from_minor
+            revenues: dict = {}
+            expenses: dict = {}
+            for account, balance in self.minor_balances().get("Equity", {}).items():
+                if not self.journal.is_income_statement_account("Equity", account):
+                    continue
+                if "revenue" in account.lower():
+                    revenues[account] = -balance
+                else:
+                    expenses[account] = balance
+
+            total_revenues, total_expenses = sum(revenues.values()), sum(expenses.values())
+            return {
+                'revenues': {account: from_minor(amount) for account, amount in revenues.items()},
+                'expenses': {account: from_minor(amount) for account, amount in expenses.items()},
+                'total_revenues': from_minor(total_revenues),
+                'total_expenses': from_minor(total_expenses),
+                'net_income': from_minor(total_revenues - total_expenses)
+            }
+
+        accounts = self._account_codes(self.journal.is_income_statement_account)
+        return self._memoised('income_statement', build, accounts)
+
+    def balance_sheet(self) -> dict:
+        """
+        Assets, liabilities and equity (liabilities and equity as positive credit balances) with the period's net
+        income shown in equity
+        """
+        def build() -> dict:
+            from_minor = self.journal.entry_store.from_minor
+            balances: dict = self.minor_balances()
+            assets: dict = dict(balances.get("Asset", {}))
+            liabilities: dict = {account: -balance for account, balance in balances.get("Liability", {}).items()}
+            equity: dict = {}
+            net_income = 0
+            for account, balance in balances.get("Equity", {}).items():
+                if self.journal.is_income_statement_account("Equity", account):
+                    net_income -= balance
+                else:
+                    equity[account] = -balance
+            equity["Net income"] = net_income
+
+            return {
+                'assets': {account: from_minor(amount) for account, amount in assets.items()},
+                'liabilities': {account: from_minor(amount) for account, amount in liabilities.items()},
+                'equity': {account: from_minor(amount) for account, amount in equity.items()},
+                'total_assets': from_minor(sum(assets.values())),
+                'total_liabilities': from_minor(sum(liabilities.values())),
+                'total_equity': from_minor(sum(equity.values()))
+            }
+
+        return self._memoised('balance_sheet', build)
+
+    def _fold_cash_flows(self, cash_accounts: np.ndarray):
+        """
+        Add the cash movements of the entries posted since the last fold to the per-counterpart totals (cash to cash
+        transfers cancel out and are skipped)
+        """
+        store = self.journal.entry_store
+        start, stop = self._cash_flow_position, store.size
+        if len(self._cash_flows) < len(store.accounts):
+            grown = np.zeros(max(len(store.accounts), 2 * len(self._cash_flows)), dtype=np.int64)
+            grown[:len(self._cash_flows)] = self._cash_flows
+            self._cash_flows = grown
+
+        debit_accounts, credit_accounts = store.debit_account[start:stop], store.credit_account[start:stop]
+        debit_cash = np.isin(debit_accounts, cash_accounts)
+        credit_cash = np.isin(credit_accounts, cash_accounts)
+
+        received = debit_cash & ~credit_cash
+        paid = credit_cash & ~debit_cash
+        np.add.at(self._cash_flows, credit_accounts[received], store.debit_amount[start:stop][received])
+        np.subtract.at(self._cash_flows, debit_accounts[paid], store.credit_amount[start:stop][paid])
+        self._cash_flow_position = stop
+
+    def cash_flow_statement(self) -> dict:
+        """
+        Direct-method cash-flow statement: net cash received (+) or paid (-) per counterpart account, grouped into
+        operating, investing and financing activities, reconciled to the beginning and ending cash balances
+        """
+        cash_accounts = self._account_codes(self.is_cash_account)
+
+        def build() -> dict:
+            store = self.journal.entry_store
+            from_minor = store.from_minor
+            self._fold_cash_flows(cash_accounts)
+
+            activities: dict = {'operating': {}, 'investing': {}, 'financing': {}}
+            for category_code, account_code in store.account_categories:
+                amount = int(self._cash_flows[account_code])
+                category, account = store.categories.values[category_code], store.accounts.values[account_code]
+                if amount != 0:
+                    # An account posted under two categories has one counterpart total, report it once
+                    activities[self.cash_flow_activity(category, account)].setdefault(account, amount)
+
+            beginning_cash = sum(balance for account, balance in self.journal.opening_account_balances.items()
+                                 if self.is_cash_account("Asset", account)
+                                 and account in self.journal.opening_balances.get("Asset", {}))
+            net_change = sum(sum(flows.values()) for flows in activities.values())
+
+            statement: dict = {activity: {account: from_minor(amount) for account, amount in flows.items()}
+                               for activity, flows in activities.items()}
+            for activity, flows in activities.items():
+                statement[f'net_{activity}'] = from_minor(sum(flows.values()))
+            statement.update({
+                'net_change': from_minor(net_change),
+                'beginning_cash': from_minor(beginning_cash),
+                'ending_cash': from_minor(beginning_cash + net_change)
+            })
+            return statement
+
+        return self._memoised('cash_flow_statement', build, cash_accounts)
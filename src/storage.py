@@ -0,0 +1,267 @@
+import sqlite3
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from transaction import Journal
+
+
+class JournalStore:
+    """
+    Persistent SQLite storage of journals - appends new postings incrementally and reloads them in bulk, amounts are
+    stored exactly as integer minor units. numpy and the journal classes are only imported by the methods that need
+    them, balance lookups run on SQLite alone
+    """
+    fields: tuple = ('transaction_id', 'date', 'description', 'debit_category', 'debit_account', 'debit_amount',
+                     'credit_category', 'credit_account', 'credit_amount')
+
+    def __init__(self, filename: str = "journal.db"):
+        self.filename: str = filename
+        self.connection = sqlite3.connect(filename)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS journals (
+                journal_name TEXT PRIMARY KEY,
+                start_date TEXT NOT NULL,
+                end_date TEXT NOT NULL,
+                currency_scale INTEGER NOT NULL DEFAULT 2,
+                adjustment_count INTEGER NOT NULL DEFAULT 0,
+                last_transaction_id INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS entries (
+                journal_name TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                transaction_id INTEGER NOT NULL,
+                date TEXT NOT NULL,
+                description TEXT NOT NULL,
+                debit_category TEXT NOT NULL,
+                debit_account TEXT NOT NULL,
+                debit_amount INTEGER NOT NULL,
+                credit_category TEXT NOT NULL,
+                credit_account TEXT NOT NULL,
+                credit_amount INTEGER NOT NULL,
+                PRIMARY KEY (journal_name, position)
+            );
+            CREATE INDEX IF NOT EXISTS entries_debit_account ON entries (journal_name, debit_account, debit_amount);
+            CREATE INDEX IF NOT EXISTS entries_credit_account ON entries (journal_name, credit_account, credit_amount);
+            CREATE TABLE IF NOT EXISTS opening_balances (
+                journal_name TEXT NOT NULL,
+                category TEXT NOT NULL,
+                account TEXT NOT NULL,
+                balance INTEGER NOT NULL,
+                PRIMARY KEY (journal_name, category, account)
+            );
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                journal_name TEXT NOT NULL,
+                fingerprint INTEGER NOT NULL,
+                PRIMARY KEY (journal_name, fingerprint)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS schedule_cache (
+                journal_name TEXT NOT NULL,
+                schedule_id NOT NULL,
+                fingerprint INTEGER NOT NULL,
+                first_month INTEGER NOT NULL,
+                amounts BLOB NOT NULL,
+                PRIMARY KEY (journal_name, schedule_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS posted_adjustments (
+                journal_name TEXT NOT NULL,
+                schedule_id NOT NULL,
+                start_date TEXT NOT NULL,
+                end_date TEXT NOT NULL,
+                PRIMARY KEY (journal_name, schedule_id, start_date, end_date)
+            ) WITHOUT ROWID;
+            CREATE TEMP TABLE IF NOT EXISTS batch_fingerprints (
+                fingerprint INTEGER PRIMARY KEY
+            );
+        """)
+        # Stores created before these columns were added
+        columns: set = {row[1] for row in self.connection.execute("PRAGMA table_info(journals)")}
+        for column in ['adjustment_count', 'last_transaction_id']:
+            if column not in columns:
+                self.connection.execute(f"ALTER TABLE journals ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+
+    def stored_entries(self, journal_name: str) -> int:
+        """
+        Number of entries stored for a journal
+        """
+        row = self.connection.execute(
+            "SELECT COUNT(*) FROM entries WHERE journal_name = ?", (journal_name,)).fetchone()
+        return row[0]
+
+    def save(self, journal: "Journal", fingerprints=None, adjustments=None):
+        """
+        Append the journal's entries that are not stored yet (incremental append) and, in the same transaction, add
+        the fingerprints of the imported source rows to the journal's seen-set and record the schedule ids whose
+        adjustments were posted for the journal's period. The highest transaction id issued so far is kept with the
+        journal, so ids stay unique after a period is closed and the next one starts without entries
+        """
+        from transaction import Transaction
+
+        stored: int = self.stored_entries(journal.journal_name)
+        store = journal.entry_store
+        last_transaction_id: int = max(Transaction.transaction_counter,
+                                       int(store.column('transaction_id').max()) if len(store) else 0)
+        placeholders = ', '.join('?' * (len(self.fields) + 2))
+
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO journals (journal_name, start_date, end_date, currency_scale, "
+                "adjustment_count, last_transaction_id) VALUES (?, ?, ?, ?, ?, ?)",
+                (journal.journal_name, journal.start_date, journal.end_date, journal.entry_store.currency_scale,
+                 journal.adjustment_count, last_transaction_id))
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO opening_balances (journal_name, category, account, balance) VALUES (?, ?, ?, ?)",
+                ((journal.journal_name, category, account, journal.opening_account_balances[account])
+                 for category, accounts in journal.opening_balances.items() for account in accounts))
+            self.connection.executemany(
+                f"INSERT INTO entries (journal_name, position, {', '.join(self.fields)}) VALUES ({placeholders})",
+                ((journal.journal_name, position, *row)
+                 for position, row in enumerate(journal.entry_store.iter_rows(first=stored, minor_units=True),
+                                                start=stored)))
+            if fingerprints is not None:
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO fingerprints (journal_name, fingerprint) VALUES (?, ?)",
+                    ((journal.journal_name, int(fingerprint)) for fingerprint in fingerprints))
+            if adjustments is not None:
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO posted_adjustments (journal_name, schedule_id, start_date, end_date) "
+                    "VALUES (?, ?, ?, ?)",
+                    ((journal.journal_name, getattr(schedule_id, 'item', lambda: schedule_id)(), journal.start_date,
+                      journal.end_date) for schedule_id in adjustments))
+
+    def load(self, journal_name: str) -> "Journal | None":
+        """
+        Reload a journal by bulk-reading its entries (indexes and balances are rebuilt without replaying
+        transactions) and continue the transaction ids after the highest one issued, None if the journal was never
+        saved
+        """
+        from transaction import Journal, Transaction
+
+        row = self.connection.execute(
+            "SELECT start_date, end_date, currency_scale, adjustment_count, last_transaction_id FROM journals "
+            "WHERE journal_name = ?",
+            (journal_name,)).fetchone()
+        if row is None:
+            return None
+
+        opening_balances: dict = {}
+        for category, account, balance in self.connection.execute(
+                "SELECT category, account, balance FROM opening_balances WHERE journal_name = ?", (journal_name,)):
+            opening_balances.setdefault(category, {})[account] = balance / 10 ** row[2]
+
+        journal = Journal(journal_name=journal_name, start_date=row[0], end_date=row[1],
+                          opening_balances=opening_balances, currency_scale=row[2])
+        rows: list = self.connection.execute(
+            f"SELECT {', '.join(self.fields)} FROM entries WHERE journal_name = ? ORDER BY position",
+            (journal_name,)).fetchall()
+        if rows:
+            journal.load_entries(dict(zip(self.fields, zip(*rows))), minor_units=True)
+        journal.adjustment_count = row[3]
+        Transaction.transaction_counter = max(Transaction.transaction_counter, row[4])
+
+        return journal
+
+    def period(self, journal_name: str) -> tuple | None:
+        """
+        (start_date, end_date) of a stored journal, None if it was never saved
+        """
+        return self.connection.execute(
+            "SELECT start_date, end_date FROM journals WHERE journal_name = ?", (journal_name,)).fetchone()
+
+    def currency_scale(self, journal_name: str) -> int | None:
+        """
+        Decimal places of the minor units of a stored journal, None if it was never saved
+        """
+        row = self.connection.execute(
+            "SELECT currency_scale FROM journals WHERE journal_name = ?", (journal_name,)).fetchone()
+        return None if row is None else row[0]
+
+    def account_balances(self, journal_name: str, accounts: list | None = None) -> dict:
+        """
+        Balances {account: balance} of a stored journal (opening balance + debits - credits) computed by SQLite
+        without loading the journal, all accounts if none are given
+        """
+        scale: int | None = self.currency_scale(journal_name)
+        if scale is None:
+            raise KeyError(f"No journal named {journal_name} is stored.")
+
+        names: list = [] if accounts is None else list(accounts)
+        account_filter = "" if accounts is None else f"AND {{column}} IN ({', '.join('?' * len(names))})"
+        parameters: list = []
+        selects: list = []
+        for select, column in [("SELECT account, balance FROM opening_balances", 'account'),
+                               ("SELECT debit_account, debit_amount FROM entries", 'debit_account'),
+                               ("SELECT credit_account, -credit_amount FROM entries", 'credit_account')]:
+            selects.append(f"{select} WHERE journal_name = ? {account_filter.format(column=column)}")
+            parameters += [journal_name, *names]
+
+        # The first select names the columns of the union
+        rows = self.connection.execute(
+            f"SELECT account, SUM(balance) FROM ({' UNION ALL '.join(selects)}) GROUP BY account", parameters).fetchall()
+
+        balances: dict = {account: balance / 10 ** scale for account, balance in rows}
+        if accounts is None:
+            return balances
+        return {account: balances.get(account, 0.0) for account in names}
+
+    def archive(self, journal_name: str, archived_name: str):
+        """
+        Keep a (closed) journal under another name, its fingerprints stay with journal_name so later imports still
+        skip the rows it already posted
+        """
+        with self.connection:
+            for table in ['journals', 'entries', 'opening_balances']:
+                self.connection.execute(f"UPDATE {table} SET journal_name = ? WHERE journal_name = ?",
+                                        (archived_name, journal_name))
+
+    def unseen(self, journal_name: str, fingerprints):
+        """
+        Mask of the fingerprints not in the journal's seen-set yet (looked up through the primary key index, so the
+        cost depends on the batch, not on the number of rows imported before)
+        """
+        import numpy as np
+
+        fingerprints = np.asarray(fingerprints, dtype=np.int64)
+        with self.connection:
+            self.connection.execute("DELETE FROM batch_fingerprints")
+            self.connection.executemany("INSERT OR IGNORE INTO batch_fingerprints (fingerprint) VALUES (?)",
+                                        ((fingerprint,) for fingerprint in fingerprints.tolist()))
+            seen: list = self.connection.execute(
+                "SELECT batch_fingerprints.fingerprint FROM batch_fingerprints JOIN fingerprints "
+                "ON fingerprints.journal_name = ? AND fingerprints.fingerprint = batch_fingerprints.fingerprint",
+                (journal_name,)).fetchall()
+        return ~np.isin(fingerprints, np.array([row[0] for row in seen], dtype=np.int64))
+
+    def posted_adjustments(self, journal_name: str, start_date: str, end_date: str) -> set:
+        """
+        Schedule ids whose adjustments were already posted to a journal for the period
+        """
+        return {row[0] for row in self.connection.execute(
+            "SELECT schedule_id FROM posted_adjustments WHERE journal_name = ? AND start_date = ? AND end_date = ?",
+            (journal_name, start_date, end_date))}
+
+    def schedule_cache(self, journal_name: str) -> dict:
+        """
+        Adjustment schedule cache of a journal as kept by "AdjustmentScheduler.cache" (empty if none was saved)
+        """
+        import numpy as np
+
+        return {schedule_id: (fingerprint, first_month, np.frombuffer(amounts, dtype=np.int64))
+                for schedule_id, fingerprint, first_month, amounts in self.connection.execute(
+                    "SELECT schedule_id, fingerprint, first_month, amounts FROM schedule_cache WHERE journal_name = ?",
+                    (journal_name,))}
+
+    def save_schedule_cache(self, journal_name: str, cache: dict):
+        """
+        Replace a journal's adjustment schedule cache (schedule ids keep their type, e.g. int or str)
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM schedule_cache WHERE journal_name = ?", (journal_name,))
+            self.connection.executemany(
+                "INSERT INTO schedule_cache (journal_name, schedule_id, fingerprint, first_month, amounts) "
+                "VALUES (?, ?, ?, ?, ?)",
+                ((journal_name, getattr(schedule_id, 'item', lambda: schedule_id)(), int(fingerprint),
+                  int(first_month), amounts.astype('<i8').tobytes())
+                 for schedule_id, (fingerprint, first_month, amounts) in cache.items()))
+
+    def close(self):
+        self.connection.close()
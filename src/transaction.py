@@ -1,8 +1,19 @@
+from array import array
+from datetime import date, timedelta
+
+import numpy as np
+from entries import EntryStore, EntryView
+from statements import FinancialStatements
+
+
 class Transaction:
     """
     Represents a single business transaction following the accounting equation (Assets = Liabilities + Equity)
     """
+    __slots__ = ('transaction_id', 'date', 'description', 'line_sides', 'line_categories', 'line_accounts',
+                 'line_amounts')
     transaction_counter: int = 0
+    categories: tuple = ("Asset", "Liability", "Equity")
 
     def __init__(self, date, description):
         Transaction.transaction_counter += 1
@@ -10,58 +21,217 @@ class Transaction:
         self.transaction_id: int = Transaction.transaction_counter  # Unique identifier for the transaction
         self.date: str = date  # Transaction date in YYYY-MM-DD format
         self.description: str = description  # Description of the transaction
-        self.entry: dict = {}  # List of journal entries (account, type, amount)
+
+        # Journal entry lines as compact parallel arrays (side 0 = debit, 1 = credit)
+        self.line_sides: array = array('b')
+        self.line_categories: tuple = ()
+        self.line_accounts: tuple = ()
+        self.line_amounts: array = array('d')
 
     def add_entry(self, debit_category: str, debit_account_name: str, debit_amount: int,
-                  credit_category: str, credit_account_name: str, credit_amount: int):
+                  credit_category: str, credit_account_name: str, credit_amount: int, minor_factor: int = 100):
         """
-        Add a journal entry (debit or credit) to the transaction
+        Add a journal entry (debit or credit) to the transaction, debit and credit must match in minor units
+        (minor_factor per currency unit, the journal's "EntryStore.minor_factor")
         """
         if debit_amount < 0 or credit_amount < 0:
             raise ValueError(f"Amount must be positive, got {debit_amount} and {credit_amount}.")
 
-        if debit_amount != credit_amount:
+        if round(debit_amount * minor_factor) != round(credit_amount * minor_factor):
             raise ValueError(f"Debit must match credit, got {debit_amount} and {credit_amount}.")
 
-        if debit_category not in ["Asset", "Liability", "Equity"] or credit_category not in ["Asset", "Liability", "Equity"]:
+        if debit_category not in Transaction.categories or credit_category not in Transaction.categories:
             raise ValueError(f"Category must be eiter 'Asset', 'Liability', or 'Equity'.")
 
-        self.entry = {
+        self._set_lines([(debit_category, debit_account_name, debit_amount)],
+                        [(credit_category, credit_account_name, credit_amount)])
+
+    def add_compound_entry(self, debits: list, credits: list, minor_factor: int = 100):
+        """
+        Add a compound journal entry with N debit and M credit lines [(category, account_name, amount), ...] that must
+        balance as a whole in minor units (minor_factor per currency unit, the journal's "EntryStore.minor_factor")
+        """
+        if not debits or not credits:
+            raise ValueError("A compound entry needs at least one debit and one credit line.")
+
+        for category, account_name, amount in [*debits, *credits]:
+            if amount < 0:
+                raise ValueError(f"Amount must be positive, got {amount} for {account_name}.")
+            if category not in Transaction.categories:
+                raise ValueError(f"Category must be either 'Asset', 'Liability', or 'Equity', got {category}.")
+
+        # Lines are rounded to minor units one by one, as "pairs" splits them when the entry is posted
+        debit_total = sum(round(amount * minor_factor) for _, _, amount in debits)
+        credit_total = sum(round(amount * minor_factor) for _, _, amount in credits)
+        if debit_total != credit_total:
+            raise ValueError(f"Debit must match credit, got {debit_total / minor_factor} and "
+                             f"{credit_total / minor_factor}.")
+
+        self._set_lines(debits, credits)
+
+    def _set_lines(self, debits: list, credits: list):
+        """
+        Replace the entry lines (debits first, then credits)
+        """
+        lines: list = [*debits, *credits]
+        self.line_sides = array('b', [0] * len(debits) + [1] * len(credits))
+        self.line_categories = tuple(category for category, _, _ in lines)
+        self.line_accounts = tuple(account_name for _, account_name, _ in lines)
+        self.line_amounts = array('d', [amount for _, _, amount in lines])
+
+    @property
+    def is_compound(self) -> bool:
+        return len(self.line_sides) > 2
+
+    @property
+    def entry(self) -> dict:
+        """
+        The recorded entry as dict (empty if none, "debits"/"credits" line lists for compound entries)
+        """
+        if not self.line_sides:
+            return {}
+
+        if self.is_compound:
+            lines = list(zip(self.line_sides, self.line_categories, self.line_accounts, self.line_amounts))
+            return {
+                'id': self.transaction_id,
+                'debits': [(category, account, amount) for side, category, account, amount in lines if side == 0],
+                'credits': [(category, account, amount) for side, category, account, amount in lines if side == 1]
+            }
+
+        return {
             'id': self.transaction_id,
-            'debit_category': debit_category,
-            'debit_account': debit_account_name,
-            'debit': debit_amount,
-            'credit_category': credit_category,
-            'credit_account': credit_account_name,
-            'credit': credit_amount
+            'debit_category': self.line_categories[0],
+            'debit_account': self.line_accounts[0],
+            'debit': self.line_amounts[0],
+            'credit_category': self.line_categories[1],
+            'credit_account': self.line_accounts[1],
+            'credit': self.line_amounts[1]
         }
 
+    def pairs(self, minor_factor: int = 1) -> list:
+        """
+        Split the entry into debit/credit pairs (debit category, debit account, credit category, credit account,
+        amount) - a balanced entry with N debit and M credit lines needs at most N + M - 1 pairs. Amounts are split
+        exactly as integer minor units (amount * minor_factor), lines that no longer balance once rounded to minor
+        units raise a ValueError
+        """
+        amounts = [round(amount * minor_factor) for amount in self.line_amounts]
+        lines = list(zip(self.line_sides, self.line_categories, self.line_accounts, amounts))
+        debits = [line for line in lines if line[0] == 0]
+        credits = [line for line in lines if line[0] == 1]
+
+        debit_total, credit_total = sum(line[3] for line in debits), sum(line[3] for line in credits)
+        if debit_total != credit_total:
+            raise ValueError(f"Transaction {self.transaction_id}: debit must match credit in minor units, got "
+                             f"{debit_total} and {credit_total} (1/{minor_factor} of the currency unit).")
+
+        pairs: list = []
+        debit_index, credit_index = 0, 0
+        debit_left, credit_left = debits[0][3], credits[0][3]
+        while debit_index < len(debits) and credit_index < len(credits):
+            amount = min(debit_left, credit_left)
+            pairs.append((debits[debit_index][1], debits[debit_index][2],
+                          credits[credit_index][1], credits[credit_index][2], amount))
+            debit_left -= amount
+            credit_left -= amount
+            if debit_left == 0:
+                debit_index += 1
+                debit_left = debits[debit_index][3] if debit_index < len(debits) else 0
+            if credit_left == 0:
+                credit_index += 1
+                credit_left = credits[credit_index][3] if credit_index < len(credits) else 0
+
+        return pairs
+
 
 class Journal:
     """
     Represents a Journal - records all business transactions
     """
-    adjustment_counter = 0
 
-    def __init__(self, journal_name: str, start_date: str, end_date: str):
+    def __init__(self, journal_name: str, start_date: str, end_date: str,
+                 opening_balances: dict | None = None, period_snapshots: dict | None = None, currency_scale: int = 2):
         self.journal_name: str = journal_name
         self.transactions: list = []  # List to store Transaction objects
-        self.journal_entries: list = []  # List to store formatted journal entries
+        # Columnar storage of the formatted journal entries, amounts in exact minor units (10 ** -currency_scale)
+        self.entry_store: EntryStore = EntryStore(currency_scale=currency_scale)
+        self.journal_entries: EntryView = EntryView(self.entry_store)  # Formatted journal entries (decoded on access)
+        self.total_debit: int = 0  # Running sum of all posted debit amounts (minor units)
+        self.total_credit: int = 0  # Running sum of all posted credit amounts (minor units)
+        self.transaction_count: int = 0  # Number of posted transactions (including adjustments)
+        self.adjustment_count: int = 0  # Number of posted adjusting entries
 
         self.start_date: str = start_date
         self.end_date: str = end_date
 
+        # Balances carried forward from the previous period {category: {account: balance}}
+        self.opening_balances: dict = {category: dict(accounts) for category, accounts in (opening_balances or {}).items()}
+        self.opening_account_balances: dict = {account: self.entry_store.to_minor(balance)
+                                               for accounts in self.opening_balances.values()
+                                               for account, balance in accounts.items()}  # Minor units
+        opening_total = sum(self.opening_account_balances.values())
+        if opening_total != 0:
+            raise ValueError(f"Opening balances must net to zero, got {self.entry_store.from_minor(opening_total)}.")
+
+        self.period_snapshots: dict = dict(period_snapshots or {})  # Closing balances of prior periods {end_date: balances}
+        self.closing_balances: dict | None = None  # Frozen snapshot once the period is closed (see "close_period")
+        self.statements: FinancialStatements = FinancialStatements(self)  # Memoised financial statements
+
+    @staticmethod
+    def is_income_statement_account(category: str, account_name: str) -> bool:
+        """
+        Revenue and expense accounts are kept as "Equity" accounts and closed into retained earnings each period
+        """
+        name = account_name.lower()
+        return category == "Equity" and ("revenue" in name or "expense" in name)
+
+    def _check_open(self):
+        """
+        Closed periods are frozen
+        """
+        if self.closing_balances is not None:
+            raise ValueError(f"Period {self.start_date} to {self.end_date} of {self.journal_name} is closed.")
+
     def _check_balance(self):
         """
-        Checks if debits match credits
+        Checks if debits match credits (running totals, see "verify" for a full scan)
+        """
+        if self.total_debit != self.total_credit:
+            raise ValueError(
+                f"Debit must match credit, got sum of debit entries={self.entry_store.from_minor(self.total_debit)} "
+                f"and sum of credit entries={self.entry_store.from_minor(self.total_credit)}"
+            )
+
+    def verify(self):
+        """
+        Recompute all totals from the journal entries and check them against the running totals and ledger (audit)
         """
-        sum_debit_entries: int = sum(entry['debit_amount'] for entry in self.journal_entries)
-        sum_credit_entries: int = sum(entry['credit_amount'] for entry in self.journal_entries)
+        store: EntryStore = self.entry_store
+        sum_debit_entries: int = int(store.column('debit_amount').sum())
+        sum_credit_entries: int = int(store.column('credit_amount').sum())
         if sum_debit_entries != sum_credit_entries:
             raise ValueError(
                 f"Debit must match credit, got sum of debit entries={sum_debit_entries} and sum of credit entries={sum_credit_entries}"
             )
 
+        if sum_debit_entries != self.total_debit or sum_credit_entries != self.total_credit:
+            raise ValueError(
+                f"Journal entries do not match running totals, got debit={sum_debit_entries} and credit={sum_credit_entries}, "
+                f"expected debit={self.total_debit} and credit={self.total_credit}"
+            )
+
+        mismatched: set = set()
+        for key in ['debit', 'credit']:
+            totals = np.zeros(len(store.accounts), dtype=np.int64)
+            np.add.at(totals, store.column(f'{key}_account'), store.column(f'{key}_amount'))
+            running = getattr(store, f'{key}_totals')[:len(store.accounts)]
+            mismatched.update(np.flatnonzero(totals != running).tolist())
+
+        if mismatched:
+            accounts = sorted(store.accounts.values[code] for code in mismatched)
+            raise ValueError(f"Journal entries do not match the account ledger for accounts {accounts}")
+
     def add_transaction(self, transaction: Transaction):
         """
         Add a Transaction object to the journal (journal entry)
@@ -69,43 +239,163 @@ class Journal:
         if not isinstance(transaction, Transaction):
             raise TypeError(f"Only Transaction objects can be added to the Journal.")
 
-        if not transaction.entry:
+        if not transaction.line_sides:
             raise ValueError(f"Transaction {transaction.transaction_id} has no entry recorded.")
 
+        self._check_open()
+
+        # Store formatted journal entries (one per debit/credit pair of compound entries), splitting and checking the
+        # date first so an entry that does not balance in minor units or is not dated is rejected before anything is
+        # recorded
+        pairs: list = transaction.pairs(self.entry_store.minor_factor)
+        try:
+            EntryStore.day_number(transaction.date)
+        except ValueError:
+            raise ValueError(f"Transaction {transaction.transaction_id}: date must be YYYY-MM-DD, "
+                             f"got {transaction.date!r}.") from None
         self.transactions.append(transaction)
+        for debit_category, debit_account, credit_category, credit_account, amount in pairs:
+            self.entry_store.append(
+                transaction_id=transaction.transaction_id,
+                date=transaction.date,
+                description=transaction.description,
+                debit_category=debit_category,
+                debit_account=debit_account,
+                debit_amount=amount,
+                credit_category=credit_category,
+                credit_account=credit_account,
+                credit_amount=amount
+            )
+            self.total_debit += amount
+            self.total_credit += amount
+        self.transaction_count += 1
+        self._check_balance()
 
-        # Create formatted journal entry
-        journal_entry = {
-            'transaction_id': transaction.transaction_id,
-            'date': transaction.date,
-            'description': transaction.description,
-            'debit_category': transaction.entry['debit_category'],
-            'debit_account': transaction.entry['debit_account'],
-            'debit_amount': transaction.entry['debit'],
-            'credit_category': transaction.entry['credit_category'],
-            'credit_account': transaction.entry['credit_account'],
-            'credit_amount': transaction.entry['credit']
-        }
-        self.journal_entries.append(journal_entry)
+    def load_entries(self, columns: dict, minor_units: bool = False):
+        """
+        Bulk-append already validated formatted journal entries given as columns {field: values} (e.g. reloaded from a
+        "JournalStore") without replaying each transaction, amounts are converted to minor units unless minor_units
+        """
+        self._check_open()
+
+        store: EntryStore = self.entry_store
+        columns = {field: columns[field] for field in store.fields}
+        if not minor_units:
+            columns['debit_amount'] = store.to_minor_array(columns['debit_amount'])
+            columns['credit_amount'] = store.to_minor_array(columns['credit_amount'])
+        start: int = store.extend(**columns)
+
+        self.total_debit += int(store.column('debit_amount')[start:].sum())
+        self.total_credit += int(store.column('credit_amount')[start:].sum())
+        self.transaction_count += len(np.unique(store.column('transaction_id')[start:]))
+
+        # Keep new Transaction ids unique after a reload
+        if len(store):
+            Transaction.transaction_counter = max(Transaction.transaction_counter,
+                                                  int(store.column('transaction_id').max()))
+        self._check_balance()
 
-    def get_all_entries(self) -> list:
+    def validate_batch(self, batch) -> list:
+        """
+        Check all rows of a batch at once, returns one message per offending row (empty if the batch is valid)
+        """
+        debit_amount = np.asarray(batch['debit_amount'], dtype=float)
+        credit_amount = np.asarray(batch['credit_amount'], dtype=float)
+        finite = np.isfinite(debit_amount) & np.isfinite(credit_amount)
+        debit_minor = self.entry_store.to_minor_array(np.where(finite, debit_amount, 0))
+        credit_minor = self.entry_store.to_minor_array(np.where(finite, credit_amount, 0))
+        debit_category = np.asarray(batch['debit_category'], dtype=object)
+        credit_category = np.asarray(batch['credit_category'], dtype=object)
+        labels = batch.index if hasattr(batch, 'index') else range(len(debit_amount))
+
+        # Dates are parsed as the entry store does, once per distinct date
+        dates: list = np.asarray(batch['date'], dtype=object).tolist()
+        dated: dict = {}
+        for value in dict.fromkeys(dates):
+            try:
+                EntryStore.day_number(value)
+                dated[value] = True
+            except (ValueError, TypeError):
+                dated[value] = False
+        undated = ~np.fromiter(map(dated.__getitem__, dates), dtype=bool, count=len(dates))
+
+        checks: list = [
+            (undated, "Date must be YYYY-MM-DD"),
+            (~finite, "Amount must be a number"),
+            ((debit_amount < 0) | (credit_amount < 0), "Amount must be positive"),
+            (debit_minor != credit_minor, "Debit must match credit"),
+            (~np.isin(debit_category, Transaction.categories) | ~np.isin(credit_category, Transaction.categories),
+             "Category must be either 'Asset', 'Liability', or 'Equity'")
+        ]
+
+        errors: list = []
+        offending = np.flatnonzero(np.logical_or.reduce([mask for mask, _ in checks]))
+        for position in offending:
+            reasons = [message for mask, message in checks if mask[position]]
+            errors.append(f"Row {labels[position]}: {', '.join(reasons)} (debit {debit_category[position]} "
+                          f"{debit_amount[position]}, credit {credit_category[position]} {credit_amount[position]}).")
+        return errors
+
+    def add_transactions(self, batch) -> np.ndarray:
+        """
+        Post many transactions at once from a DataFrame or dict of arrays with the columns date, description,
+        debit_category, debit_account_name, debit_amount, credit_category, credit_account_name and credit_amount
+        (e.g. "Data.normalise_frame"). The whole batch is validated first, every offending row is reported in one
+        ValueError and nothing is posted. Returns the assigned transaction ids
+        """
+        self._check_open()
+
+        errors: list = self.validate_batch(batch)
+        if errors:
+            raise ValueError(f"{len(errors)} invalid transactions in batch:\n" + "\n".join(errors))
+
+        # The ids are only reserved once the entries are stored ("load_entries" moves the counter past them)
+        count: int = len(batch['date'])
+        transaction_ids = np.arange(Transaction.transaction_counter + 1, Transaction.transaction_counter + count + 1)
+
+        def as_list(values) -> list:
+            return values.tolist() if hasattr(values, 'tolist') else list(values)
+
+        self.load_entries({
+            'transaction_id': transaction_ids,
+            'date': as_list(batch['date']),
+            'description': as_list(batch['description']),
+            'debit_category': as_list(batch['debit_category']),
+            'debit_account': as_list(batch['debit_account_name']),
+            'debit_amount': np.asarray(batch['debit_amount'], dtype=float),
+            'credit_category': as_list(batch['credit_category']),
+            'credit_account': as_list(batch['credit_account_name']),
+            'credit_amount': np.asarray(batch['credit_amount'], dtype=float)
+        })
+        return transaction_ids
+
+    def get_all_entries(self) -> EntryView:
         """
         Get all journal entries in chronological order
         """
         return self.journal_entries
 
-    def get_entries_by_date(self, date: str) -> list:
+    def get_entries_by_date(self, date: str) -> EntryView:
         """
         Retrieve all journal entries for a specific date "YYYY-MM-DD"
         """
-        return [entry for entry in self.journal_entries if entry['date'] == date]
+        return EntryView(self.entry_store, self.entry_store.date_positions(date, date))
 
-    def get_single_account_entries(self, account_name: str) -> list:
+    def get_entries_between(self, start_date: str, end_date: str) -> EntryView:
         """
-        Retrieve all journal entries involving a specific account
+        Retrieve all journal entries from start_date to end_date "YYYY-MM-DD" (inclusive) sorted by date
         """
-        return [entry for entry in self.journal_entries
-                if entry['debit_account'] == account_name or entry['credit_account'] == account_name]
+        return EntryView(self.entry_store, self.entry_store.date_positions(start_date, end_date))
+
+    def get_single_account_entries(self, account_name: str,
+                                   start_date: str | None = None, end_date: str | None = None) -> EntryView:
+        """
+        Retrieve all journal entries involving a specific account, optionally limited to a date range (sorted by date)
+        """
+        positions = self.entry_store.account_positions(account_name, start_date, end_date)
+        if start_date is None and end_date is None:
+            positions.sort()  # Posting order
+        return EntryView(self.entry_store, positions)
 
     def get_single_account_balance(self, account_name: str) -> int:
         """
@@ -113,12 +403,25 @@ class Journal:
         """
         self._check_balance()
 
-        debits_balance: int = sum(
-            entry['debit_amount'] for entry in self.journal_entries if entry['debit_account'] == account_name)
-        credits_balance: int = sum(
-            entry['credit_amount'] for entry in self.journal_entries if entry['credit_account'] == account_name)
+        return self.entry_store.from_minor(self.opening_account_balances.get(account_name, 0)
+                                           + self.entry_store.account_balance(account_name))
 
-        return debits_balance - credits_balance
+    def _get_minor_account_balances(self) -> dict:
+        """
+        All account balances by category in exact minor units
+        """
+        store: EntryStore = self.entry_store
+        account_totals: list = (store.debit_totals - store.credit_totals).tolist()
+
+        balances: dict = {category: {account: self.opening_account_balances[account] for account in accounts}
+                          for category, accounts in self.opening_balances.items()}
+        for category_code, account_code in store.account_categories:
+            category = store.categories.values[category_code]
+            account = store.accounts.values[account_code]
+            balances.setdefault(category, {})[account] = (self.opening_account_balances.get(account, 0)
+                                                          + account_totals[account_code])
+
+        return balances
 
     def get_account_balances(self) -> dict[str, {str, int}]:
         """
@@ -126,15 +429,9 @@ class Journal:
         """
         self._check_balance()
 
-        balances: dict = {}
-        for entry in self.journal_entries:
-            for key in ['debit', 'credit']:
-                category = entry[f'{key}_category']
-                account = entry[f'{key}_account']
-
-                balances.setdefault(category, {})[account] = self.get_single_account_balance(account)
-
-        return balances
+        from_minor = self.entry_store.from_minor
+        return {category: {account: from_minor(balance) for account, balance in accounts.items()}
+                for category, accounts in self._get_minor_account_balances().items()}
 
     def get_category_balances(self) -> dict[str, int]:
         """
@@ -142,19 +439,17 @@ class Journal:
         """
         self._check_balance()
 
-        balances: dict = self.get_account_balances()
-        return {category: sum(items.values()) for category, items in balances.items()}
+        balances: dict = self._get_minor_account_balances()
+        return {category: self.entry_store.from_minor(sum(items.values())) for category, items in balances.items()}
 
     def adjust_journal_entry(self, adjustment_date: str, description: str,
                              debit_category: str, debit_account_name: str, debit_amount: int,
                              credit_category: str, credit_account_name: str, credit_amount: int):
 
-        Journal.adjustment_counter += 1
-
         if debit_amount < 0 or credit_amount < 0:
             raise ValueError(f"Amount must be positive, got {debit_amount} and {credit_amount}.")
 
-        if debit_amount != credit_amount:
+        if self.entry_store.to_minor(debit_amount) != self.entry_store.to_minor(credit_amount):
             raise ValueError(f"Debit must match credit, got {debit_amount} and {credit_amount}.")
 
         adjustment_txn = Transaction(date=adjustment_date, description=description)
@@ -164,10 +459,21 @@ class Journal:
             debit_amount=debit_amount,
             credit_category=credit_category,
             credit_account_name=credit_account_name,
-            credit_amount=credit_amount
+            credit_amount=credit_amount,
+            minor_factor=self.entry_store.minor_factor
         )
 
         self.add_transaction(adjustment_txn)
+        self.adjustment_count += 1
+
+    def adjust_journal_entries(self, batch) -> np.ndarray:
+        """
+        Post many adjusting entries at once through the bulk path (same columns as "add_transactions", e.g. the
+        output of "AdjustmentScheduler.adjustments"), returns the assigned transaction ids
+        """
+        transaction_ids: np.ndarray = self.add_transactions(batch)
+        self.adjustment_count += len(transaction_ids)
+        return transaction_ids
 
     def get_trial_balance(self):
         """
@@ -178,10 +484,76 @@ class Journal:
         category_balances: dict = self.get_category_balances()
         return category_balances["Asset"]
 
+    def get_income_statement(self) -> dict:
+        """
+        Revenues, expenses and net income of the period (memoised, see "FinancialStatements")
+        """
+        return self.statements.income_statement()
+
+    def get_balance_sheet(self) -> dict:
+        """
+        Assets, liabilities and equity at the end of the period (memoised, see "FinancialStatements")
+        """
+        return self.statements.balance_sheet()
+
+    def get_cash_flow_statement(self) -> dict:
+        """
+        Cash received and paid by operating, investing and financing activities (memoised, see "FinancialStatements")
+        """
+        return self.statements.cash_flow_statement()
+
+    def close_period(self, retained_earnings_account: str = "Retained earnings",
+                     next_start_date: str | None = None, next_end_date: str | None = None) -> "Journal":
+        """
+        Close the period at end_date: freeze a balance snapshot, roll revenue and expense accounts into retained earnings
+        and open the journal of the next period (the following calendar month by default) from that snapshot
+        """
+        self._check_open()
+
+        self._check_balance()
+
+        balances: dict = self._get_minor_account_balances()
+        closing_minor: dict = {}
+        net_income = 0
+        for category, accounts in balances.items():
+            for account, balance in accounts.items():
+                if self.is_income_statement_account(category, account):
+                    net_income += balance
+                else:
+                    closing_minor.setdefault(category, {})[account] = balance
+
+        equity: dict = closing_minor.setdefault("Equity", {})
+        equity[retained_earnings_account] = equity.get(retained_earnings_account, 0) + net_income
+
+        from_minor = self.entry_store.from_minor
+        closing_balances: dict = {category: {account: from_minor(balance) for account, balance in accounts.items()}
+                                  for category, accounts in closing_minor.items()}
+
+        self.closing_balances = closing_balances
+        self.period_snapshots[self.end_date] = closing_balances
+
+        if next_start_date is None:
+            next_start_date = (date.fromisoformat(self.end_date) + timedelta(days=1)).isoformat()
+        if next_end_date is None:
+            following_month = (date.fromisoformat(next_start_date).replace(day=28) + timedelta(days=4)).replace(day=1)
+            next_end_date = (following_month - timedelta(days=1)).isoformat()
+
+        return Journal(journal_name=self.journal_name, start_date=next_start_date, end_date=next_end_date,
+                       opening_balances=closing_balances, period_snapshots=self.period_snapshots,
+                       currency_scale=self.entry_store.currency_scale)
+
+    def get_period_snapshot(self, end_date: str) -> dict:
+        """
+        Closing balances of a prior period (served from the snapshot cache) for comparative reports
+        """
+        if end_date not in self.period_snapshots:
+            raise KeyError(f"No closed period ends on {end_date}.")
+        return self.period_snapshots[end_date]
+
     def __len__(self):
-        return len(self.transactions) - self.adjustment_counter
+        return self.transaction_count - self.adjustment_count
 
     def __repr__(self):
         return (f"Journal {self.journal_name} for operating range {self.start_date} to {self.end_date}.\n"
-                f"Transactions: {len(self.transactions) - self.adjustment_counter}, "
-                f"adjustments: {self.adjustment_counter}")
+                f"Transactions: {self.transaction_count - self.adjustment_count}, "
+                f"adjustments: {self.adjustment_count}")
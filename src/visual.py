@@ -1,38 +1,71 @@
+import hashlib
+import io
+import json
+import os
+import re
+import zipfile
+from copy import copy
+from xml.sax.saxutils import escape, unescape
+
+import numpy as np
 import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.packaging.custom import StringProperty
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.utils import get_column_letter
 from transaction import Journal
 
 
 class Visualization:
+    # Transactions worksheet header -> journal entry field
+    columns: dict = {
+        'Transaction ID': 'transaction_id',
+        'Date': 'date',
+        'Description': 'description',
+        'Debit Category': 'debit_category',
+        'Debit Account': 'debit_account',
+        'Debit Amount': 'debit_amount',
+        'Credit Category': 'credit_category',
+        'Credit Account': 'credit_account',
+        'Credit Amount': 'credit_amount'
+    }
+    watermark_property: str = 'journal_export'  # Custom document property with the export watermark
+    transactions_part: str = 'xl/worksheets/sheet1.xml'  # The Transactions sheet of a streaming export
+
     def __init__(self, transactions: list, journal: Journal):
         self.transactions = transactions
         self.journal = journal
 
     def _transactions_to_dataframe(self) -> pd.DataFrame:
         """
-        Converts "Transaction" objects to DataFrame
-        """
-        data = []
-        for txn in self.transactions:
-            if txn.entry:
-                data.append({
-                    'Transaction ID': txn.entry.get('id'),
-                    'Date': txn.date,
-                    'Description': txn.description,
-                    'Debit Category': txn.entry.get('debit_category'),
-                    'Debit Account': txn.entry.get('debit_account'),
-                    'Debit Amount': txn.entry.get('debit'),
-                    'Credit Category': txn.entry.get('credit_category'),
-                    'Credit Account': txn.entry.get('credit_account'),
-                    'Credit Amount': txn.entry.get('credit')
-                })
+        Converts the journal's entries to DataFrame (including bulk-posted and reloaded entries without "Transaction"
+        objects, compound entries span one row per debit/credit pair with the same Transaction ID)
+        """
+        store = self.journal.entry_store
+        vocabularies: dict = {'date': store.dates, 'debit_category': store.categories, 'debit_account': store.accounts,
+                              'credit_category': store.categories, 'credit_account': store.accounts}
+
+        data: dict = {}
+        for header, field in self.columns.items():
+            if field == 'description':
+                data[header] = store.description
+            elif field in vocabularies:
+                data[header] = np.array(vocabularies[field].values, dtype=object)[store.column(field)]
+            elif field.endswith('_amount'):
+                data[header] = store.from_minor(store.column(field))
+            else:
+                data[header] = store.column(field)
         return pd.DataFrame(data)
 
     def _build_adjusted_trial_balance_sheet(self, worksheet):
         """
         Build adjusted trial balance with proper formatting
         """
-        account_balances = self.journal.get_account_balances()
+        # Balances and totals stay exact integer minor units, converted once per written cell
+        self.journal._check_balance()
+        account_balances = self.journal.statements.minor_balances()
+        from_minor = self.journal.entry_store.from_minor
 
         section_header_font = Font(bold=True, size=10, color='FFFFFF')
         section_header_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
@@ -112,7 +145,7 @@ class Visualization:
                 data_cell1.fill = white_fill
 
                 data_cell2 = worksheet.cell(row=row, column=2)
-                data_cell2.value = abs(balance)
+                data_cell2.value = abs(from_minor(balance))
                 data_cell2.font = data_font
                 data_cell2.alignment = Alignment(horizontal='right')
                 data_cell2.fill = white_fill
@@ -128,7 +161,7 @@ class Visualization:
             total_cell1.fill = total_fill
 
             total_cell2 = worksheet.cell(row=row, column=2)
-            total_cell2.value = abs(category_total)
+            total_cell2.value = abs(from_minor(category_total))
             total_cell2.font = total_font
             total_cell2.fill = total_fill
             total_cell2.alignment = Alignment(horizontal='right')
@@ -165,7 +198,7 @@ class Visualization:
                 data_cell1.fill = white_fill
 
                 data_cell2 = worksheet.cell(row=row, column=2)
-                data_cell2.value = abs(balance)
+                data_cell2.value = abs(from_minor(balance))
                 data_cell2.font = data_font
                 data_cell2.alignment = Alignment(horizontal='right')
                 data_cell2.fill = white_fill
@@ -181,7 +214,7 @@ class Visualization:
             total_cell1.fill = total_fill
 
             total_cell2 = worksheet.cell(row=row, column=2)
-            total_cell2.value = abs(liability_total)
+            total_cell2.value = abs(from_minor(liability_total))
             total_cell2.font = total_font
             total_cell2.fill = total_fill
             total_cell2.alignment = Alignment(horizontal='right')
@@ -209,7 +242,7 @@ class Visualization:
                 data_cell1.fill = white_fill
 
                 data_cell2 = worksheet.cell(row=row, column=2)
-                data_cell2.value = abs(balance)
+                data_cell2.value = abs(from_minor(balance))
                 data_cell2.font = data_font
                 data_cell2.alignment = Alignment(horizontal='right')
                 data_cell2.fill = white_fill
@@ -225,7 +258,7 @@ class Visualization:
             total_cell1.fill = total_fill
 
             total_cell2 = worksheet.cell(row=row, column=2)
-            total_cell2.value = abs(equity_total)
+            total_cell2.value = abs(from_minor(equity_total))
             total_cell2.font = total_font
             total_cell2.fill = total_fill
             total_cell2.alignment = Alignment(horizontal='right')
@@ -246,7 +279,7 @@ class Visualization:
         total_cell1.fill = total_fill
 
         total_cell2 = worksheet.cell(row=row, column=2)
-        total_cell2.value = abs(total_liability_equity)
+        total_cell2.value = abs(from_minor(total_liability_equity))
         total_cell2.font = total_font
         total_cell2.fill = total_fill
         total_cell2.alignment = Alignment(horizontal='right')
@@ -257,10 +290,364 @@ class Visualization:
             right=Side(style='thin')
         )
 
-    def export_to_excel(self, filename: str):
+    def _statement_sections(self) -> dict:
+        """
+        Sheet title -> [(section header, {line: amount}, total label, total)] of the financial statements (served from
+        the journal's memoised "FinancialStatements")
+        """
+        income_statement: dict = self.journal.get_income_statement()
+        balance_sheet: dict = self.journal.get_balance_sheet()
+        cash_flow: dict = self.journal.get_cash_flow_statement()
+
+        return {
+            'Income Statement': [
+                ("Revenues:", income_statement['revenues'], "Total revenues:", income_statement['total_revenues']),
+                ("Expenses:", income_statement['expenses'], "Total expenses:", income_statement['total_expenses']),
+                ("Net income:", {}, "Net income:", income_statement['net_income'])
+            ],
+            'Balance Sheet': [
+                ("Assets:", balance_sheet['assets'], "Total assets:", balance_sheet['total_assets']),
+                ("Liabilities:", balance_sheet['liabilities'], "Total liabilities:",
+                 balance_sheet['total_liabilities']),
+                ("Equity:", balance_sheet['equity'], "Total equity:", balance_sheet['total_equity'])
+            ],
+            'Cash Flow': [
+                ("Operating activities:", cash_flow['operating'], "Net cash from operating activities:",
+                 cash_flow['net_operating']),
+                ("Investing activities:", cash_flow['investing'], "Net cash from investing activities:",
+                 cash_flow['net_investing']),
+                ("Financing activities:", cash_flow['financing'], "Net cash from financing activities:",
+                 cash_flow['net_financing']),
+                ("Cash:", {"Beginning cash": cash_flow['beginning_cash'], "Net change": cash_flow['net_change']},
+                 "Ending cash:", cash_flow['ending_cash'])
+            ]
+        }
+
+    def _build_statement_sheet(self, worksheet, title: str, sections: list):
+        """
+        Build a financial statement sheet in the style of the trial balance
+        """
+        section_header_font = Font(bold=True, size=10, color='FFFFFF')
+        section_header_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
+        total_font = Font(bold=True)
+        total_fill = PatternFill(start_color='D9E8F5', end_color='D9E8F5', fill_type='solid')
+        data_font = Font(size=10)
+        white_fill = PatternFill(start_color='FFFFFF', end_color='FFFFFF', fill_type='solid')
+
+        worksheet.column_dimensions['A'].width = 40
+        worksheet.column_dimensions['B'].width = 15
+
+        row = 1
+        for text in [self.journal.journal_name, title,
+                     f"Operating period {self.journal.start_date} to {self.journal.end_date}"]:
+            cell = worksheet.cell(row=row, column=1)
+            cell.value = text
+            cell.font = Font(size=14, bold=True)
+            cell.fill = white_fill
+            cell.alignment = Alignment(horizontal='center', vertical='center')
+            worksheet.cell(row=row, column=2).fill = white_fill
+            worksheet.merge_cells(f'A{row}:B{row}')
+            row += 1
+
+        for header, lines, total_label, total in sections:
+            if lines:
+                for column in [1, 2]:
+                    header_cell = worksheet.cell(row=row, column=column)
+                    header_cell.fill = section_header_fill
+                header_cell = worksheet.cell(row=row, column=1)
+                header_cell.value = header
+                header_cell.font = section_header_font
+                row += 1
+
+            for line, amount in lines.items():
+                if amount == 0:
+                    continue
+
+                data_cell1 = worksheet.cell(row=row, column=1)
+                data_cell1.value = line
+                data_cell1.font = data_font
+                data_cell1.fill = white_fill
+
+                data_cell2 = worksheet.cell(row=row, column=2)
+                data_cell2.value = amount
+                data_cell2.font = data_font
+                data_cell2.alignment = Alignment(horizontal='right')
+                data_cell2.fill = white_fill
+                row += 1
+
+            total_cell1 = worksheet.cell(row=row, column=1)
+            total_cell1.value = total_label
+            total_cell1.font = total_font
+            total_cell1.fill = total_fill
+
+            total_cell2 = worksheet.cell(row=row, column=2)
+            total_cell2.value = total
+            total_cell2.font = total_font
+            total_cell2.fill = total_fill
+            total_cell2.alignment = Alignment(horizontal='right')
+            total_cell2.border = Border(
+                bottom=Side(style='double'),
+                top=Side(style='thin'),
+                left=Side(style='thin'),
+                right=Side(style='thin')
+            )
+            row += 2
+
+    def _write_transactions_sheet_streaming(self, worksheet, rows=None):
+        """
+        Stream all journal entries (or the given rows) with styles into a write-only worksheet (one pass, constant
+        memory)
+        """
+        store = self.journal.entry_store
+
+        # Write-only sheets emit column widths before the rows, so use the journal's running max lengths
+        for col_num, (header, field) in enumerate(self.columns.items(), start=1):
+            max_length = max(len(header), store.max_lengths[field])
+            worksheet.column_dimensions[get_column_letter(col_num)].width = min(max_length + 2, 50)
+
+        header_font = Font(bold=True, color='FFFFFF')
+        header_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
+        white_fill = PatternFill(start_color='FFFFFF', end_color='FFFFFF', fill_type='solid')
+
+        def styled_cell(value, font=None, fill=white_fill):
+            cell = WriteOnlyCell(worksheet, value=value)
+            if font is not None:
+                cell.font = font
+            cell.fill = fill
+            return cell
+
+        worksheet.append([styled_cell(header, font=header_font, fill=header_fill) for header in self.columns])
+        for row in store.iter_rows() if rows is None else rows:
+            worksheet.append([styled_cell(value) for value in row])
+
+    @staticmethod
+    def _copy_sheet_streaming(source, worksheet):
+        """
+        Copy values, styles, merged cells and column widths of a worksheet into a write-only worksheet
+        """
+        for column, dimension in source.column_dimensions.items():
+            worksheet.column_dimensions[column].width = dimension.width
+        for merged_range in source.merged_cells.ranges:
+            worksheet.merged_cells.add(merged_range.coord)
+
+        for row in source.iter_rows():
+            cells = []
+            for source_cell in row:
+                cell = WriteOnlyCell(worksheet, value=source_cell.value)
+                if source_cell.has_style:
+                    cell.font = copy(source_cell.font)
+                    cell.fill = copy(source_cell.fill)
+                    cell.border = copy(source_cell.border)
+                    cell.alignment = copy(source_cell.alignment)
+                cells.append(cell)
+            worksheet.append(cells)
+
+    def _streaming_workbook(self, statements: bool = False, rows=None) -> Workbook:
+        """
+        Write-only workbook of the streaming export (with the given Transactions rows instead of all entries) carrying
+        the export watermark
+        """
+        workbook = Workbook(write_only=True)
+        worksheet1 = workbook.create_sheet('Transactions')
+        worksheet2 = workbook.create_sheet('Trial Balance')
+
+        self._write_transactions_sheet_streaming(worksheet1, rows=rows)
+
+        # The trial balance is small, build it in a regular sheet and copy it over
+        trial_balance = Workbook().active
+        self._build_adjusted_trial_balance_sheet(trial_balance)
+        self._copy_sheet_streaming(trial_balance, worksheet2)
+
+        if statements:
+            for title, sections in self._statement_sections().items():
+                statement = Workbook().active
+                self._build_statement_sheet(statement, title, sections)
+                self._copy_sheet_streaming(statement, workbook.create_sheet(title))
+
+        workbook.custom_doc_props.append(StringProperty(name=self.watermark_property,
+                                                        value=json.dumps(self._watermark(statements))))
+        return workbook
+
+    def export_to_excel_streaming(self, filename: str, statements: bool = False):
+        """
+        Export like "export_to_excel", but stream the journal entries through a write-only workbook (flat memory)
+        """
+        self._streaming_workbook(statements).save(filename)
+
+    def _watermark(self, statements: bool) -> dict:
+        """
+        What an export contains: the journal and period, the number of exported entries with a digest of the last one
+        and a digest of the account balances the trial balance and statements were built from
+        """
+        balances = json.dumps(self.journal.statements.account_balances())
+        return {
+            'journal_name': self.journal.journal_name,
+            'start_date': self.journal.start_date,
+            'end_date': self.journal.end_date,
+            'statements': statements,
+            'rows': self.journal.entry_store.size,
+            'last_entry': self._entry_digest(self.journal.entry_store.size - 1),
+            'balances': hashlib.sha1(balances.encode()).hexdigest()
+        }
+
+    def _entry_digest(self, position: int) -> str | None:
+        """
+        Digest of the entry at a position (None before the first entry)
+        """
+        if position < 0:
+            return None
+        entry = next(self.journal.entry_store.iter_rows(first=position, chunk_size=1, minor_units=True))
+        return hashlib.sha1(json.dumps([str(value) for value in entry]).encode()).hexdigest()
+
+    @classmethod
+    def _read_watermark(cls, archive: zipfile.ZipFile) -> dict | None:
+        """
+        Export watermark of a workbook written by the streaming export, None if it has none
+        """
+        try:
+            properties = archive.read('docProps/custom.xml').decode()
+        except KeyError:
+            return None
+        match = re.search(rf'<property name="{cls.watermark_property}"[^>]*><vt:lpwstr>(.*?)</vt:lpwstr>', properties)
+        return json.loads(unescape(match.group(1))) if match else None
+
+    @staticmethod
+    def _row_styles(sheet_xml: str, row: int) -> list:
+        """
+        Style ids of the cells of a row in a worksheet part
+        """
+        match = re.search(rf'<row r="{row}"[^>]*>(.*?)</row>', sheet_xml)
+        return re.findall(r'<c r="[A-Z]+\d+" s="(\d+)"', match.group(1)) if match else []
+
+    @staticmethod
+    def _rows_xml(rows, first_row: int, styles: list) -> str:
+        """
+        Worksheet rows in the markup of openpyxl's write-only sheets (inline strings)
+        """
+        letters: list = [get_column_letter(column) for column in range(1, len(styles) + 1)]
+        parts: list = []
+        for row_number, row in enumerate(rows, start=first_row):
+            parts.append(f'<row r="{row_number}">')
+            for letter, style, value in zip(letters, styles, row):
+                if value is None:
+                    continue
+                if isinstance(value, str):
+                    text = escape(value)
+                    space = ' xml:space="preserve"' if text != text.strip() else ''
+                    parts.append(f'<c r="{letter}{row_number}" s="{style}" t="inlineStr"><is><t{space}>{text}</t>'
+                                 f'</is></c>')
+                else:
+                    parts.append(f'<c r="{letter}{row_number}" s="{style}" t="n"><v>{value}</v></c>')
+            parts.append('</row>')
+        return ''.join(parts)
+
+    def export_to_excel_incremental(self, filename: str, statements: bool = False) -> str:
+        """
+        Update a workbook written by an earlier streaming/incremental export of this journal in place: only the
+        entries posted since are appended to the Transactions sheet, and the trial balance (and statements) are only
+        rebuilt if the account balances changed. Falls back to a full streaming export if the file is missing, was
+        written for another journal, period or sheet set, or the exported entries no longer match. Returns "full",
+        "append" or "unchanged"
+        """
+        store = self.journal.entry_store
+        watermark: dict = self._watermark(statements)
+        previous = None
+        if os.path.exists(filename) and zipfile.is_zipfile(filename):
+            with zipfile.ZipFile(filename) as archive:
+                previous = self._read_watermark(archive)
+
+        keys: list = ['journal_name', 'start_date', 'end_date', 'statements']
+        if (previous is None or not 0 < previous.get('rows', 0) <= store.size
+                or any(previous.get(key) != watermark[key] for key in keys)
+                or self._entry_digest(previous['rows'] - 1) != previous.get('last_entry')):
+            self.export_to_excel_streaming(filename, statements=statements)
+            return 'full'
+
+        balances_changed: bool = previous['balances'] != watermark['balances']
+        if previous['rows'] == store.size and not balances_changed:
+            return 'unchanged'
+
+        # Every part but the Transactions sheet comes from the old file, or from a freshly built workbook (whose
+        # Transactions sheet holds only the header and one row to register the same cell styles) if balances changed
+        base = io.BytesIO()
+        if balances_changed:
+            self._streaming_workbook(statements, rows=[next(store.iter_rows(first=store.size - 1))]).save(base)
+        else:
+            with open(filename, 'rb') as file:
+                base.write(file.read())
+
+        with zipfile.ZipFile(filename) as old, zipfile.ZipFile(base) as parts:
+            head = old.open(self.transactions_part).read(1 << 16).decode('utf-8', errors='ignore')
+            styles: list = self._row_styles(head, 2)
+            if not styles or (balances_changed and self._row_styles(
+                    parts.read(self.transactions_part).decode(), 2) != styles):
+                self.export_to_excel_streaming(filename, statements=statements)
+                return 'full'
+
+            temporary = f"{filename}.tmp"
+            with zipfile.ZipFile(temporary, 'w', zipfile.ZIP_DEFLATED) as new:
+                for info in parts.infolist():
+                    if info.filename == 'docProps/custom.xml':
+                        properties = parts.read(info).decode()
+                        properties = re.sub(
+                            rf'(<property name="{self.watermark_property}"[^>]*><vt:lpwstr>).*?(</vt:lpwstr>)',
+                            lambda match: match.group(1) + escape(json.dumps(watermark)) + match.group(2), properties)
+                        new.writestr(info, properties)
+                    elif info.filename != self.transactions_part:
+                        new.writestr(info, parts.read(info))
+
+                self._append_transactions_part(old, new, self._rows_xml(
+                    store.iter_rows(first=previous['rows']), previous['rows'] + 2, styles))
+        os.replace(temporary, filename)
+        return 'append'
+
+    def _append_transactions_part(self, old: zipfile.ZipFile, new: zipfile.ZipFile, rows_xml: str):
+        """
+        Copy the Transactions sheet of the old export into the new one with updated column widths and the new rows
+        inserted before the end of the sheet data (streamed, the old rows are never parsed)
+        """
+        store = self.journal.entry_store
+        columns: str = ''.join(
+            f'<col width="{min(max(len(header), store.max_lengths[field]) + 2, 50)}" customWidth="1" '
+            f'min="{column}" max="{column}" />' for column, (header, field) in enumerate(self.columns.items(), start=1))
+
+        with old.open(self.transactions_part) as source, \
+                new.open(zipfile.ZipInfo(self.transactions_part, date_time=(1980, 1, 1, 0, 0, 0)), 'w',
+                         force_zip64=True) as target:
+            pending: bytes = source.read(1 << 16)
+            head_end: int = pending.index(b'<sheetData>')
+            head: str = re.sub(r'<cols>.*?</cols>', f'<cols>{columns}</cols>', pending[:head_end].decode())
+            target.write(head.encode())
+            pending = pending[head_end:]
+
+            keep: int = 1 << 12  # The end of the sheet data is in the last few hundred bytes
+            while chunk := source.read(1 << 20):
+                pending += chunk
+                if len(pending) > keep:
+                    target.write(pending[:-keep])
+                    pending = pending[-keep:]
+
+            end: int = pending.rindex(b'</sheetData>')
+            target.write(pending[:end])
+            target.write(rows_xml.encode())
+            target.write(pending[end:])
+
+    def export_to_excel(self, filename: str, streaming: bool = False, statements: bool = False,
+                        incremental: bool = False):
         """
         Export transactions to first worksheet and trial balance to second worksheet in Excel file
+        (streaming=True writes the journal entries in one pass, see "export_to_excel_streaming", statements=True adds
+        income statement, balance sheet and cash flow sheets, incremental=True only updates what changed since the
+        last streaming or incremental export to the file, see "export_to_excel_incremental")
         """
+        if incremental:
+            self.export_to_excel_incremental(filename, statements=statements)
+            return
+
+        if streaming:
+            self.export_to_excel_streaming(filename, statements=statements)
+            return
+
         transactions = self._transactions_to_dataframe()
 
         with pd.ExcelWriter(filename, engine='openpyxl') as writer:
@@ -297,3 +684,7 @@ class Visualization:
                 worksheet1.column_dimensions[column].width = adjusted_width
 
             self._build_adjusted_trial_balance_sheet(worksheet2)
+
+            if statements:
+                for title, sections in self._statement_sections().items():
+                    self._build_statement_sheet(workbook.create_sheet(title), title, sections)
@@ -0,0 +1,236 @@
+import io
+import posixpath
+import re
+import zipfile
+from functools import lru_cache
+from html import unescape
+
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils import column_index_from_string
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
+
+PREFIX: str = r'(?:\w+:)?'  # Optional namespace prefix of SpreadsheetML tags
+ROW_TAG = re.compile(r'<(\w+:)?row\b')
+VALUE = re.compile(rf'<{PREFIX}v>(.*?)</{PREFIX}v>', re.S)
+TEXT = re.compile(rf'<{PREFIX}t\b[^>]*?(?:/>|>(.*?)</{PREFIX}t>)', re.S)
+PHONETIC = re.compile(rf'<{PREFIX}rPh\b.*?</{PREFIX}rPh>', re.S)
+
+
+@lru_cache
+def token_pattern(prefix: str) -> re.Pattern:
+    """
+    A row start, or a cell with its column letters, style and type (attributes in any order) and either a lone value,
+    a plain inline string or any other content (formulas, rich text), for sheets whose tags carry the given prefix
+    (matching the prefix literally is much faster than an optional one)
+    """
+    p = re.escape(prefix)
+    return re.compile(
+        rf'(<){p}row\b[^>]*>'
+        rf'|<{p}c(?:\s+(?:r="([A-Z]+)\d*"|s="(\d+)"|t="(\w+)"|[\w:]+="[^"]*"))*\s*'
+        rf'(?:/>|>(?:<{p}v>([^<]*)</{p}v>|<{p}is><{p}t(?:\s[^>]*)?>([^<]*)</{p}t></{p}is>|(.*?))</{p}c>)', re.S)
+
+
+class WorksheetReader:
+    """
+    Streaming reader of the cell values of one worksheet of an .xlsx workbook, equivalent to openpyxl's read-only
+    iter_rows(values_only=True) for plain data sheets (shared and inline strings, numbers, dates and durations by cell
+    style, ISO dates, booleans, cached formula results) but scanning the sheet XML with regular expressions instead
+    of building a cell object per value. Empty rows are skipped ("parity_mismatches" checks a workbook against
+    openpyxl)
+    """
+
+    def __init__(self, filename: str, sheet_name: str, block_size: int = 1 << 20):
+        self.filename: str = filename
+        self.sheet_name: str = sheet_name
+        self.block_size: int = block_size  # Characters of sheet XML scanned at a time
+
+    @staticmethod
+    def _text(xml: str) -> str:
+        """
+        Concatenated text runs of a shared or inline string (phonetic runs left out)
+        """
+        if '<rPh' in xml or ':rPh' in xml:
+            xml = PHONETIC.sub('', xml)
+        text = ''.join(run or '' for run in TEXT.findall(xml))
+        return unescape(text) if '&' in text else text
+
+    def _sheet_part(self, archive: zipfile.ZipFile) -> str:
+        """
+        Archive member of the worksheet, found through the workbook relationships
+        """
+        workbook = archive.read('xl/workbook.xml').decode('utf-8')
+        for attributes in re.findall(rf'<{PREFIX}sheet\b([^>]*)/?>', workbook):
+            name = re.search(r'\bname="([^"]*)"', attributes)
+            if name is not None and unescape(name.group(1)) == self.sheet_name:
+                relation = re.search(r'\b\w+:id="([^"]*)"', attributes).group(1)
+                break
+        else:
+            raise KeyError(f"Worksheet {self.sheet_name} does not exist.")
+
+        relations = archive.read('xl/_rels/workbook.xml.rels').decode('utf-8')
+        for attributes in re.findall(rf'<{PREFIX}Relationship\b([^>]*)/?>', relations):
+            if re.search(rf'\bId="{re.escape(relation)}"', attributes):
+                target = re.search(r'\bTarget="([^"]*)"', attributes).group(1)
+                return target.lstrip('/') if target.startswith('/') else posixpath.normpath(f"xl/{target}")
+        raise KeyError(f"Worksheet {self.sheet_name} has no part in {self.filename}.")
+
+    @staticmethod
+    def _date_styles(archive: zipfile.ZipFile) -> dict:
+        """
+        Indexes of the cell styles with a date or time number format {style: True for durations, e.g. [h]:mm}
+        """
+        try:
+            styles = archive.read('xl/styles.xml').decode('utf-8')
+        except KeyError:
+            return {}
+
+        formats: dict = dict(BUILTIN_FORMATS)
+        for attributes in re.findall(rf'<{PREFIX}numFmt\b([^>]*)/?>', styles):
+            number_format = re.search(r'\bnumFmtId="(\d+)"', attributes)
+            code = re.search(r'\bformatCode="([^"]*)"', attributes)
+            if number_format is not None and code is not None:
+                formats[int(number_format.group(1))] = unescape(code.group(1))
+
+        cell_styles = re.search(rf'<{PREFIX}cellXfs\b[^>]*>(.*?)</{PREFIX}cellXfs>', styles, re.S)
+        if cell_styles is None:
+            return {}
+        date_styles: dict = {}
+        for index, attributes in enumerate(re.findall(rf'<{PREFIX}xf\b([^>]*?)/?>', cell_styles.group(1))):
+            number_format = re.search(r'\bnumFmtId="(\d+)"', attributes)
+            code = formats.get(int(number_format.group(1))) if number_format is not None else None
+            if code is not None and is_date_format(code):
+                date_styles[str(index)] = is_timedelta_format(code)
+        return date_styles
+
+    def iter_rows(self):
+        """
+        Yield the values of every non-empty row as a list (None for empty cells, up to the last filled cell)
+        """
+        columns: dict = {}  # Column letters -> index, filled on first use
+
+        with zipfile.ZipFile(self.filename) as archive:
+            part = self._sheet_part(archive)
+            date_styles = self._date_styles(archive)
+            workbook = archive.read('xl/workbook.xml').decode('utf-8')
+            epoch = CALENDAR_MAC_1904 if re.search(r'\bdate1904="(1|true)"', workbook) else CALENDAR_WINDOWS_1900
+            try:
+                shared = archive.read('xl/sharedStrings.xml').decode('utf-8')
+                strings: list = [self._text(item) for item in re.findall(
+                    rf'<{PREFIX}si\b[^>]*?(?:/>|>(.*?)</{PREFIX}si>)', shared, re.S)]
+            except KeyError:
+                strings = []
+
+            with io.TextIOWrapper(archive.open(part), encoding='utf-8') as sheet:
+                pending: str = ''
+                close: str | None = None  # End tag of a row, with the prefix the sheet uses
+                tokens: re.Pattern | None = None
+                values: list = []
+                while True:
+                    block = sheet.read(self.block_size)
+                    pending += block
+                    if close is None and (tag := ROW_TAG.search(pending)) is not None:
+                        close = f"</{tag.group(1) or ''}row>"
+                        tokens = token_pattern(tag.group(1) or '')
+                    # Scan up to the end of the last complete row, the rest is kept for the next block
+                    end = len(pending)
+                    if block:
+                        last = pending.rfind(close) if close is not None else -1
+                        end = last + len(close) if last >= 0 else 0
+
+                    for row, letters, style, kind, raw, inline, other in (
+                            tokens.findall(pending, 0, end) if tokens is not None else ()):
+                        if row:
+                            if self._trim(values):
+                                yield values
+                            values = []
+                            continue
+
+                        if letters:
+                            column = columns.get(letters)
+                            if column is None:
+                                column = columns[letters] = column_index_from_string(letters) - 1
+                            if column > len(values):
+                                values.extend([None] * (column - len(values)))
+
+                        if kind == 'inlineStr':
+                            value = self._text(other) if other else unescape(inline) if '&' in inline else inline
+                        else:
+                            if other:
+                                raw = VALUE.search(other)
+                                raw = raw.group(1) if raw is not None else ''
+                            value = self._value(raw, kind, style, strings, date_styles, epoch) if raw else None
+                        values.append(value)
+                    if not block:
+                        break
+                    pending = pending[end:]
+                if self._trim(values):
+                    yield values
+
+    @staticmethod
+    def _trim(values: list) -> list:
+        """
+        Drop the trailing empty cells of a row (in place)
+        """
+        while values and values[-1] is None:
+            values.pop()
+        return values
+
+    @staticmethod
+    def _value(raw: str, kind: str, style: str, strings: list, date_styles: dict, epoch):
+        """
+        Value of a cell from the text of its "v" element, its type and style (serial dates outside the calendar become
+        "#VALUE!" as in openpyxl)
+        """
+        if kind == 's':
+            return strings[int(raw)]
+        if kind in ('', 'n'):
+            value = float(raw) if '.' in raw or 'E' in raw or 'e' in raw else int(raw)
+            if style not in date_styles:
+                return value
+            try:
+                return from_excel(value, epoch, timedelta=date_styles[style])
+            except (OverflowError, ValueError):
+                return '#VALUE!'
+        if kind == 'd':
+            return from_ISO8601(raw)
+        if kind == 'b':
+            return raw == '1'
+        return unescape(raw) if '&' in raw else raw  # 'str' (formula result) and 'e' (error)
+
+
+def parity_mismatches(filename: str, sheet_name: str, limit: int = 10) -> list:
+    """
+    Compare a worksheet as read by "WorksheetReader" with openpyxl's read-only cached values (empty rows and trailing
+    empty cells left out), returns up to limit (row, openpyxl values, reader values) that differ (empty if none)
+    """
+    from itertools import zip_longest
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(filename, read_only=True, data_only=True)
+    try:
+        expected = (WorksheetReader._trim(list(row)) for row in workbook[sheet_name].iter_rows(values_only=True))
+        rows = zip_longest((row for row in expected if row), WorksheetReader(filename, sheet_name).iter_rows())
+        mismatches: list = []
+        for number, (openpyxl_values, values) in enumerate(rows, start=1):
+            if openpyxl_values != values:
+                mismatches.append((number, openpyxl_values, values))
+                if len(mismatches) >= limit:
+                    break
+        return mismatches
+    finally:
+        workbook.close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check that WorksheetReader reads a worksheet like openpyxl")
+    parser.add_argument('filename')
+    parser.add_argument('--sheet', default='Transactions')
+    args = parser.parse_args()
+
+    found: list = parity_mismatches(args.filename, args.sheet)
+    for number, openpyxl_values, values in found:
+        print(f"Row {number}: openpyxl {openpyxl_values}, WorksheetReader {values}")
+    raise SystemExit(1 if found else 0)